@@ -1,11 +1,17 @@
-# we will use copy to make a deepcopy of the board
-import copy
-from typing import List, Any, Tuple
+from typing import List, Any, Dict, Optional, Tuple, Union
 
 # import Stack and Queue classes for BFS/DFS
 from stack_and_queue import Stack, Queue
 
 
+# coordinates of every cell in each 3x3 subgrid, keyed by (row // 3, col // 3).
+# built once at import so subgrid_coordinates doesn't scan the whole board
+SUBGRID_COORDS: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+for _r in range(9):
+    for _c in range(9):
+        SUBGRID_COORDS.setdefault((_r // 3, _c // 3), []).append((_r, _c))
+
+
 def remove_if_exists(lst: Any, elem: Any) -> None:
     """Takes a list and element and removes that element if it exists in the list.
 
@@ -36,9 +42,14 @@ class Board:
             single number that is the assignment.
     """
 
-    def __init__(self):
+    def __init__(self, rows: Optional[List[List[Any]]] = None) -> None:
         """Constructor for a board, sets up a board with each element having all
-        numbers as possibilities"""
+        numbers as possibilities
+
+        Args:
+            rows - optional cells to start from instead (used by copy); the board
+                takes them over as they are
+        """
         self.size: int = 9
         self.num_nums_placed: int = 0
 
@@ -46,13 +57,28 @@ class Board:
         # 9 quadrants, 9 cells in each 3*3 subgrid, 9 possible numbers in each cell
         # Note: using Any in the type hint since the cell can be either a list (when it
         # has not yet been assigned a value) or a number (once it has been assigned)
-        self.rows: List[List[Any]] = []
+        if rows is not None:
+            self.rows: List[List[Any]] = rows
+            return
+        self.rows = []
         for i in range(self.size):
-            arow = []
+            arow: List[Any] = []
             for j in range(self.size):
                 arow.append([1,2,3,4,5,6,7,8,9])
             self.rows.append(arow)
 
+    def copy(self) -> "Board":
+        """Makes an independent copy of the board, same as copy.deepcopy but much
+        cheaper: only the lists of possibilities need copying, placed numbers are ints
+
+        Returns:
+            the new board
+        """
+        new_board = Board([[cell[:] if isinstance(cell, list) else cell for cell in row]
+                           for row in self.rows])
+        new_board.num_nums_placed = self.num_nums_placed
+        return new_board
+
     def __str__(self) -> str:
         """String representation of the board"""
         row_str = ""
@@ -93,23 +119,20 @@ class Board:
             list of (row, col) that represent all cells in the box.
         """
         # Note: row // 3 gives the index of the subgrid for the row index, this is one
-        # of 0, 1 or 2, col // 3 gives us the same for the column
-        coords = []
-        for r in range(self.size):
-            for c in range(self.size):
-                if r//3 == row//3 and c//3 == col//3:
-                    coords.append((r,c))
-        return coords
+        # of 0, 1 or 2, col // 3 gives us the same for the column. The lists are
+        # precomputed in SUBGRID_COORDS; return a copy so callers can't alter the table
+        return SUBGRID_COORDS[(row // 3, col // 3)][:]
 
-    def find_most_constrained_cell(self) -> Tuple[int, int]:
+    def find_most_constrained_cell(self) -> Optional[Tuple[int, int]]:
         """Finds the coordinates (row and column indices) of the cell that contains the
         fewest possible values to assign (the shortest list). Note: in the case of ties
         return the coordinates of the first minimum size cell found
 
         Returns:
-            a tuple of row, column index identifying the most constrained cell
+            a tuple of row, column index identifying the most constrained cell, or
+            None if every cell has been assigned
         """
-        shortest_cell_size = 9 #max is 9 numbers possible
+        shortest_cell_size = 10 #one more than the max of 9 numbers possible, so any open cell counts
         shortest_cell_coords = None
         for r in range(self.size):
             for c in range(self.size):
@@ -124,8 +147,6 @@ class Board:
         #return the coordinates of the shortest cell
         return shortest_cell_coords
 
-        return None
-
     def failure_test(self) -> bool:
         """Check if we've failed to correctly fill out the puzzle. If we find a cell
         that contains an [], then we have no more possibilities for the cell but haven't
@@ -183,25 +204,42 @@ class Board:
         #increment the number of numbers placed
         self.num_nums_placed += 1
 
-def generic_search(state:Board, container:Stack or Queue) -> Board:
+def generic_search(state:Board, container:Union[Stack, Queue], stats: Optional[dict] = None,
+                   max_nodes: Optional[int] = None) -> Optional[Board]:
     """Performs a generic search. Takes a Board and a container (stack or queue) and attempts to assign values to most constrained cells until a solution is reached or a mistake has been made at which point it backtracks.
     Args:
         state - an instance of the Board class to solve, need to find most constrained cell and attempt an assignment
         container - a stack or queue to store the states
+        stats - optional dict, filled in with "nodes" (states expanded) and
+            "timed_out" (True if max_nodes was hit)
+        max_nodes - optional limit on states to expand before giving up
     Returns:
-        either None in the case of invalid input
+        either None in the case of invalid input (or when max_nodes is hit)
         returns the solved board if we win
     """
+    if stats is None:
+        stats = {}
+    stats['nodes'] = 0
+    stats['timed_out'] = False
+
     #Then, push the initial state onto the stack
     container.push(state)
     #for each state on the stack, pop it off, check if we have won
     while not container.is_empty():
         current_state = container.pop()
+        stats['nodes'] += 1
+        #give up once we've used our budget of states
+        if max_nodes is not None and stats['nodes'] > max_nodes:
+            stats['timed_out'] = True
+            return None
         #we test win or fail when we add the state to the stack, so no need to do it here
         most_constrained_cell = current_state.find_most_constrained_cell() #a tuple
+        #no open cells left means the board we were given was already complete
+        if most_constrained_cell is None:
+            return current_state
         #add states of all possible moves
         for number in current_state.rows[most_constrained_cell[0]][most_constrained_cell[1]]:
-            new_state = copy.deepcopy(current_state)
+            new_state = current_state.copy()
             #optimization - check if we have been here before with this number, if so, skip it
             new_state.update(most_constrained_cell[0], most_constrained_cell[1], number)
             #check if it's a failure, if so, skip it
@@ -221,7 +259,7 @@ def generic_search(state:Board, container:Stack or Queue) -> Board:
     return None
 
 
-def DFS(state: Board) -> Board:
+def DFS(state: Board, stats: Optional[dict] = None, max_nodes: Optional[int] = None) -> Optional[Board]:
     """Performs a depth first search. Takes a Board and attempts to assign values to
     most constrained cells until a solution is reached or a mistake has been made at
     which point it backtracks.
@@ -229,15 +267,17 @@ def DFS(state: Board) -> Board:
     Args:
         state - an instance of the Board class to solve, need to find most constrained
             cell and attempt an assignment
+        stats - optional dict to collect search statistics (see generic_search)
+        max_nodes - optional limit on states to expand (see generic_search)
 
     Returns:
         either None in the case of invalid input
         returns the solved board if we win
     """
 
-    return generic_search(state, Stack())
+    return generic_search(state, Stack(), stats, max_nodes)
 
-def BFS(state: Board) -> Board:
+def BFS(state: Board) -> Optional[Board]:
     """Performs a breadth first search. Takes a Board and attempts to assign
     values to most constrained cells until a solution is reached or a mistake
     has been made at which point it backtracks.
@@ -314,7 +354,7 @@ second_puzzle = [
     (8, 7, 5),
 ]
 
-def driver_test_dfs_or_bfs(use_dfs: bool, moves: List[Tuple[int, int, int]]) -> None:
+def driver_test_dfs_or_bfs(use_dfs: bool, moves: List[Tuple[int, int, int]]) -> Optional[Board]:
     b = Board()
     # make initial moves to set up board
     for move in moves:
@@ -327,7 +367,8 @@ def driver_test_dfs_or_bfs(use_dfs: bool, moves: List[Tuple[int, int, int]]) ->
     solution = (DFS if use_dfs else BFS)(b)
     # print solved board
     print("<<<<< Solved Board >>>>>\n")
-    solution.print_pretty()
+    if solution is not None:
+        solution.print_pretty()
     return solution
 
 
@@ -355,7 +396,25 @@ if __name__ == "__main__":
     myb.rows[6][5] = [2,3]
     myb.rows[4][3] = 5
     assert myb.find_most_constrained_cell() == (6,5), "find most constrained test 3"
+
+    myb = Board()
+    assert myb.find_most_constrained_cell() == (0,0), "find most constrained test 4"
+
+    myb = Board([[(3 * (r % 3) + r // 3 + c) % 9 + 1 for c in range(9)] for r in range(9)])
+    myb.num_nums_placed = 81
+    assert myb.find_most_constrained_cell() is None, "find most constrained test 5"
+    assert DFS(myb) is myb, "find most constrained test 6"
     print("find most constrained test suite passed")
+
+    myb = Board()
+    myb.update(0, 0, 3)
+    copied = myb.copy()
+    assert copied.rows == myb.rows and copied.num_nums_placed == 1, "copy test 1"
+    copied.update(8, 8, 5)
+    assert myb.rows[8][8] == [1,2,3,4,5,6,7,8,9] and myb.num_nums_placed == 1, "copy test 2"
+    assert 5 in myb.rows[0][8] and 5 not in copied.rows[0][8], "copy test 3"
+    assert copied.rows[0][0] == 3 and copied.rows[8][8] == 5, "copy test 4"
+    print("copy test suite passed")
     
 
     myb = Board()
@@ -455,6 +514,27 @@ if __name__ == "__main__":
     assert 3 not in myb.rows[2][2], "update test 5"
     print("update test suite passed")
 
+    myb = Board()
+    for move in first_puzzle:
+        myb.update(*move)
+    stats: Dict[str, Any] = {}
+    assert DFS(myb.copy(), stats, 1) is None, "search stats test 1"
+    assert stats == {'nodes': 2, 'timed_out': True}, "search stats test 2"
+
+    stats = {}
+    assert isinstance(DFS(myb.copy(), stats), Board), "search stats test 3"
+    assert stats['nodes'] > 1 and stats['timed_out'] == False, "search stats test 4"
+    needed = stats['nodes']
+
+    stats = {}
+    assert isinstance(DFS(myb.copy(), stats, needed), Board), "search stats test 5"
+    assert stats == {'nodes': needed, 'timed_out': False}, "search stats test 6"
+
+    stats = {}
+    assert DFS(myb.copy(), stats, needed - 1) is None, "search stats test 7"
+    assert stats == {'nodes': needed, 'timed_out': True}, "search stats test 8"
+    print("search stats test suite passed")
+
     print("all function test suites passed")
 
     assert isinstance(driver_test_dfs_or_bfs(True, first_puzzle), Board), "DFS test 1"
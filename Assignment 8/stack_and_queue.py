@@ -8,7 +8,7 @@ S = TypeVar("S")
 Q = TypeVar("Q")
 
 
-class Stack:
+class Stack(Generic[S]):
     """A last in first out (LIFO) stack representation where elements are pushed and
     popped from the top. Think of a stack of plates, where you can't remove or add a
     plate in the middle, only take from, or add to, the top
@@ -59,7 +59,7 @@ class Stack:
         return self.the_stack.pop()
 
 
-class Queue:
+class Queue(Generic[Q]):
     """A first in first out (FIFO) queue representation where elements are pushed at the
     end of the queue and popped from the front. Think of a line at an amusement park
     where new people join (pushed) the line at the back and are let in (popped) from the
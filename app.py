@@ -3,17 +3,23 @@ Sudoku Web Application - Flask Backend
 Provides API endpoints for puzzle generation, validation, solving, and hints
 """
 
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, g, jsonify, request, render_template, stream_with_context
 from flask_cors import CORS
 import random
-import copy
-from typing import List, Tuple, Optional
+import functools
+import hmac
 import sys
+import threading
+import time
+from typing import Callable, List, Tuple, Optional
 import os
 
-# Import the existing solver
-sys.path.append(os.path.join(os.path.dirname(__file__), 'Assignment 8'))
-from Assignment8 import Board, DFS
+from events import EventChannel, parse_last_event_id
+from grid_generator import generate_grid
+from hints import AnalysisCache
+import metrics
+# The existing solver, compiled if build_solver.py has been run
+from solver_core import SOLVER_IMPLEMENTATION, Board, DFS, first_puzzle
 
 app = Flask(__name__)
 CORS(app)
@@ -25,59 +31,105 @@ DIFFICULTY_LEVELS = {
     'hard': 55       # Remove 55 cells (26 filled)
 }
 
+# Search states a single solver run may expand before it gives up
+SOLVER_MAX_NODES = int(os.environ.get('SOLVER_MAX_NODES', 200000))
+
+# ?profile=1 is only honoured with an X-Profile-Token header matching this
+# (profiling is off when it isn't set); output files go to PROFILE_DIR
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+# Whether clients may stream puzzle generation over /api/events. Each open
+# stream holds a worker, so it is off for sync workers; the development
+# server and the ASGI mode turn it on
+app.config['STREAM_EVENTS'] = os.environ.get('STREAM_EVENTS') == '1'
+
+# Events that end a session's stream: the puzzle is ready or generation failed
+STREAM_END_EVENTS = ('puzzle', 'failed')
+
+
+def run_solver(board: Board, difficulty: str, purpose: str) -> Tuple[Optional[Board], bool]:
+    """
+    Run DFS within the node budget and record it in the solver metrics
+    Returns: (solved board or None, whether the budget ran out)
+    """
+    stats = {}
+    start = time.perf_counter()
+    solved = DFS(board, stats, SOLVER_MAX_NODES)
+    metrics.observe_solver(difficulty, purpose, stats, time.perf_counter() - start)
+    return solved, stats['timed_out']
+
 
 class PuzzleGenerator:
     """Generates sudoku puzzles at various difficulty levels"""
 
     @staticmethod
-    def generate_solved_board() -> Board:
-        """Generate a complete, valid sudoku solution"""
-        board = Board()
+    def generate_solution(difficulty: str = 'unknown') -> List[List[int]]:
+        """
+        Generate a complete, valid sudoku solution as a 2D list
+        (difficulty only labels metrics)
+        """
+        stats = {}
+        start = time.perf_counter()
+        grid = generate_grid(stats=stats)
+        metrics.observe_solver(difficulty, 'generate', stats, time.perf_counter() - start)
+        metrics.observe_retries(stats['restarts'])
+        return grid
 
-        # Fill diagonal 3x3 boxes first (they're independent)
-        for box in range(3):
-            nums = list(range(1, 10))
-            random.shuffle(nums)
-            idx = 0
-            for i in range(3):
-                for j in range(3):
-                    row = box * 3 + i
-                    col = box * 3 + j
-                    board.update(row, col, nums[idx])
-                    idx += 1
-
-        # Use solver to complete the rest
-        solved = DFS(board)
-        return solved if solved else PuzzleGenerator.generate_solved_board()
+    @staticmethod
+    def generate_solved_board(difficulty: str = 'unknown') -> Board:
+        """Generate a complete, valid sudoku solution as a Board"""
+        grid = PuzzleGenerator.generate_solution(difficulty)
+
+        board = Board()
+        for r in range(9):
+            for c in range(9):
+                board.update(r, c, grid[r][c])
+        return board
 
     @staticmethod
-    def create_puzzle(difficulty: str = 'medium') -> Tuple[List[List[int]], List[List[int]]]:
+    def create_puzzle(difficulty: str = 'medium',
+                      progress: Optional[Callable[[int, int], None]] = None
+                      ) -> Tuple[List[List[int]], List[List[int]]]:
         """
         Create a puzzle by removing cells from a solved board
+        progress, if given, is called as progress(removed, target) after
+        each cell is removed
         Returns: (puzzle, solution) as 2D lists
         """
         # Generate a complete solution
-        solved_board = PuzzleGenerator.generate_solved_board()
-
-        # Extract the solution as a 2D list
-        solution = []
-        for row in solved_board.rows:
-            solution_row = []
-            for cell in row:
-                solution_row.append(cell if isinstance(cell, int) else 0)
-            solution.append(solution_row)
+        solution = PuzzleGenerator.generate_solution(difficulty)
 
         # Create puzzle by removing cells
         puzzle = [row[:] for row in solution]  # Deep copy
-        cells_to_remove = DIFFICULTY_LEVELS.get(difficulty, 45)
+        puzzle, _ = PuzzleGenerator.remove_cells(puzzle, PuzzleGenerator.removal_order(),
+                                                 0, difficulty, progress)
+
+        return puzzle, solution
 
-        # Get all cell positions
+    @staticmethod
+    def removal_order() -> List[Tuple[int, int]]:
+        """All cell positions, in the random order create_puzzle tries them"""
         all_positions = [(i, j) for i in range(9) for j in range(9)]
         random.shuffle(all_positions)
+        return all_positions
+
+    @staticmethod
+    def remove_cells(puzzle: List[List[int]], positions: List[Tuple[int, int]],
+                     removed: int, difficulty: str = 'medium',
+                     progress: Optional[Callable[[int, int], None]] = None
+                     ) -> Tuple[List[List[int]], int]:
+        """
+        Try to remove each of positions from puzzle in turn, keeping only the
+        removals that leave it solvable, until the difficulty's target is
+        reached. removed is how many cells were taken out before, so a
+        puzzle can be worked through a slice of positions at a time.
+        Returns: (puzzle, cells removed so far)
+        """
+        cells_to_remove = DIFFICULTY_LEVELS.get(difficulty, 45)
 
         # Remove cells while ensuring puzzle remains solvable
-        removed = 0
-        for row, col in all_positions:
+        for row, col in positions:
             if removed >= cells_to_remove:
                 break
 
@@ -92,197 +144,763 @@ class PuzzleGenerator:
                     if puzzle[r][c] != 0:
                         test_board.update(r, c, puzzle[r][c])
 
-            # Check if solvable
-            if DFS(copy.deepcopy(test_board)):
+            # Check if solvable (running out of budget counts as unsolvable)
+            solvable, _ = run_solver(test_board.copy(), difficulty, 'remove')
+            if solvable:
                 removed += 1
+                metrics.observe_removal(difficulty, 'kept')
+                if progress:
+                    progress(removed, cells_to_remove)
             else:
                 # Restore the cell if removal makes it unsolvable
                 puzzle[row][col] = backup
+                metrics.observe_removal(difficulty, 'restored')
 
-        return puzzle, solution
+        return puzzle, removed
 
 
 # Store current game sessions (in production, use Redis or database)
 game_sessions = {}
 
+# Handlers below take the parsed JSON body and return (payload, status) so the
+# same logic can be served by Flask (this module) or the ASGI layer (asgi.py).
+# Solver-heavy work is split out into plain functions (create_puzzle,
+# is_solvable) that the ASGI layer runs in an executor.
 
-@app.route('/')
-def index():
-    """Serve the main game page"""
-    return render_template('index.html')
 
+def get_session(session_id) -> Optional[dict]:
+    """Look up a session whose puzzle is ready to play; None otherwise"""
+    session = game_sessions.get(session_id)
+    if session is None or session['status'] != 'ready':
+        return None
+    return session
 
-@app.route('/api/new-puzzle', methods=['POST'])
-def new_puzzle():
+
+def out_of_sync(session: dict, data: dict) -> Optional[Tuple[dict, int]]:
     """
-    Generate a new puzzle
-    Request body: {"difficulty": "easy|medium|hard"}
+    Check the client's sequence number against the session's move counter.
+    Returns a 409 response carrying the server's board so the client can
+    resync, or None when the client is up to date (or sent no seq at all).
     """
-    data = request.json
-    difficulty = data.get('difficulty', 'medium')
+    seq = data.get('seq')
+    if seq is None or seq == session['seq']:
+        return None
 
-    if difficulty not in DIFFICULTY_LEVELS:
-        return jsonify({'error': 'Invalid difficulty level'}), 400
+    return {
+        'error': 'Out of sync',
+        'seq': session['seq'],
+        'board': session['board']
+    }, 409
 
-    puzzle, solution = PuzzleGenerator.create_puzzle(difficulty)
 
+def apply_move(session: dict, row: int, col: int, value: int) -> int:
+    """
+    Apply a single {row, col, value} delta to the session's board and record
+    it in the move history so it can be undone. A value of 0 clears the cell.
+    Returns the new sequence number.
+    """
+    board = session['board']
+    session['history'].append((row, col, board[row][col]))
+    board[row][col] = value
+    session['seq'] += 1
+
+    # The game is won; its hint analyses won't be needed again
+    if board == session['solution']:
+        session['analysis'].clear()
+    return session['seq']
+
+
+def parse_move(session: dict, data: dict) -> Optional[Tuple[int, int, int]]:
+    """Read and bounds-check a {row, col, value} delta; None if malformed"""
+    row = data.get('row')
+    col = data.get('col')
+    value = data.get('value')
+
+    for field in (row, col, value):
+        if not isinstance(field, int) or isinstance(field, bool):
+            return None
+    if not (0 <= row < 9 and 0 <= col < 9 and 0 <= value <= 9):
+        return None
+    if session['initial_puzzle'][row][col] != 0:
+        return None
+
+    return row, col, value
+
+
+def is_solvable(grid: List[List[int]], difficulty: str = 'unknown') -> bool:
+    """
+    Check whether a 2D board (0 = empty) can still be completed. A search
+    that runs out of budget gives the player the benefit of the doubt.
+    """
+    test_board = Board()
+    for r in range(9):
+        for c in range(9):
+            if grid[r][c] != 0:
+                test_board.update(r, c, grid[r][c])
+
+    # DFS expects at least one empty cell; a full board has already been
+    # checked for conflicts, so it is solved
+    if test_board.goal_test():
+        return True
+
+    solved, timed_out = run_solver(test_board, difficulty, 'validate')
+    return solved is not None or timed_out
+
+
+def parse_difficulty(data: dict) -> Optional[str]:
+    """Read the requested difficulty; None if it isn't a known level"""
+    difficulty = data.get('difficulty', 'medium')
+    return difficulty if difficulty in DIFFICULTY_LEVELS else None
+
+
+def new_session(difficulty: str) -> str:
+    """Register an empty session (puzzle still generating); returns its ID"""
     # Generate session ID
     session_id = str(random.randint(100000, 999999))
 
     # Store session
     game_sessions[session_id] = {
+        'status': 'generating',
+        'difficulty': difficulty,
+        'puzzle': None,
+        'solution': None,
+        'initial_puzzle': None,
+        'board': None,
+        'history': [],
+        'seq': 0,
+        'streamed': False,
+        # Held while a move is checked against seq and applied
+        'lock': threading.Lock(),
+        'events': EventChannel(),
+        'analysis': AnalysisCache()
+    }
+    metrics.SESSIONS.set(len(game_sessions))
+
+    return session_id
+
+
+def fill_session(session_id: str, puzzle: List[List[int]],
+                 solution: List[List[int]]) -> dict:
+    """Attach a generated puzzle to a session and mark it ready to play"""
+    session = game_sessions[session_id]
+    session.update({
         'puzzle': puzzle,
         'solution': solution,
-        'initial_puzzle': [row[:] for row in puzzle]
-    }
+        'initial_puzzle': [row[:] for row in puzzle],
+        'board': [row[:] for row in puzzle],
+        'status': 'ready'
+    })
 
-    return jsonify({
+    return {
         'session_id': session_id,
         'puzzle': puzzle,
-        'difficulty': difficulty
-    })
+        'difficulty': session['difficulty'],
+        'seq': 0
+    }
 
 
-@app.route('/api/validate-move', methods=['POST'])
-def validate_move():
+def start_session(difficulty: str, puzzle: List[List[int]],
+                  solution: List[List[int]]) -> Tuple[dict, int]:
+    """Register a freshly generated puzzle as a new game session"""
+    return fill_session(new_session(difficulty), puzzle, solution), 200
+
+
+def new_streamed_session(difficulty: str) -> Tuple[dict, int]:
     """
-    Validate if a move makes the board unsolvable
-    Request: {"session_id": str, "row": int, "col": int, "value": int, "current_board": 2D list}
+    Register a session whose puzzle is generated in the background. Progress
+    and the finished puzzle are pushed on the session's event stream as
+    "progress" and "puzzle" events ("failed" if generation raised).
+    Returns the 202 response carrying the session ID.
     """
-    data = request.json
-    session_id = data.get('session_id')
-    row = data.get('row')
-    col = data.get('col')
-    value = data.get('value')
+    session_id = new_session(difficulty)
+    game_sessions[session_id]['streamed'] = True
+
+    return {
+        'session_id': session_id,
+        'difficulty': difficulty,
+        'status': 'generating'
+    }, 202
+
+
+def progress_reporter(session_id: str) -> Callable[[int, int], None]:
+    """A create_puzzle progress callback publishing to the session's stream"""
+    events = game_sessions[session_id]['events']
+
+    def report(removed: int, target: int) -> None:
+        events.publish('progress', {'removed': removed, 'target': target})
+
+    return report
+
+
+def publish_puzzle(session_id: str, puzzle: List[List[int]],
+                   solution: List[List[int]]) -> None:
+    """Make a streamed session playable and send its puzzle to the client"""
+    game_sessions[session_id]['events'].publish('puzzle',
+                                                fill_session(session_id, puzzle, solution))
+
+
+def publish_failure(session_id: str) -> None:
+    """Log the exception being handled and end the session's stream with "failed" """
+    app.logger.exception('Puzzle generation failed')
+    game_sessions[session_id]['status'] = 'failed'
+    game_sessions[session_id]['events'].publish('failed',
+                                                {'error': 'Puzzle generation failed'})
+
+
+def start_generation(difficulty: str) -> Tuple[dict, int]:
+    """Start a streamed session (see new_streamed_session), generating its
+    puzzle in a background thread"""
+    payload, status = new_streamed_session(difficulty)
+    session_id = payload['session_id']
+
+    def generate() -> None:
+        try:
+            puzzle, solution = PuzzleGenerator.create_puzzle(
+                difficulty, progress_reporter(session_id))
+        except Exception:
+            publish_failure(session_id)
+            return
+        publish_puzzle(session_id, puzzle, solution)
+
+    threading.Thread(target=generate, daemon=True).start()
+
+    return payload, status
+
+
+def stream_finished(session: dict, last_id: int) -> bool:
+    """
+    True if a session's event stream has nothing more to send: its puzzle
+    wasn't streamed, or the client has already seen how generation ended
+    """
+    return not session['streamed'] or session['events'].finished(last_id, STREAM_END_EVENTS)
+
+
+def prepare_validation(data: dict):
+    """
+    First (cheap) half of move validation: session/seq checks, bounds and
+    row/column/box conflicts.
+    Returns (response, None) when the move can be answered straight away, or
+    (None, pending) where pending holds the board to check with is_solvable
+    and the state finish_validation needs.
+    """
+    session = get_session(data.get('session_id'))
     current_board = data.get('current_board')
 
-    if session_id not in game_sessions:
-        return jsonify({'error': 'Invalid session'}), 400
+    if session is None:
+        return ({'error': 'Invalid session'}, 400), None
 
-    session = game_sessions[session_id]
     solution = session['solution']
+    # The board the checks below see; finish_validation makes sure it hasn't moved on
+    seq = session['seq']
+
+    stale = out_of_sync(session, data)
+    if stale:
+        return stale, None
+
+    move = parse_move(session, data)
+    if move is None or move[2] == 0:
+        return ({'error': 'Invalid move'}, 400), None
+    row, col, value = move
+
+    # Delta mode: validate against (and then update) the stored board
+    delta_mode = current_board is None
+    if delta_mode:
+        current_board = session['board']
 
     # Check if it matches the solution
     is_correct = solution[row][col] == value
 
     # Check for basic rule violations (duplicate in row/col/box)
-    has_conflict = False
+    conflicts = set()
 
     # Check row
     for c in range(9):
         if c != col and current_board[row][c] == value:
-            has_conflict = True
-            break
+            conflicts.add((row, c))
 
     # Check column
-    if not has_conflict:
-        for r in range(9):
-            if r != row and current_board[r][col] == value:
-                has_conflict = True
-                break
+    for r in range(9):
+        if r != row and current_board[r][col] == value:
+            conflicts.add((r, col))
 
     # Check 3x3 box
-    if not has_conflict:
-        box_row, box_col = 3 * (row // 3), 3 * (col // 3)
-        for r in range(box_row, box_row + 3):
-            for c in range(box_col, box_col + 3):
-                if (r, c) != (row, col) and current_board[r][c] == value:
-                    has_conflict = True
-                    break
-            if has_conflict:
-                break
+    box_row, box_col = 3 * (row // 3), 3 * (col // 3)
+    for r in range(box_row, box_row + 3):
+        for c in range(box_col, box_col + 3):
+            if (r, c) != (row, col) and current_board[r][c] == value:
+                conflicts.add((r, c))
 
     # If there's a conflict, it's definitely wrong
-    if has_conflict:
-        return jsonify({
+    if conflicts:
+        response = {
             'valid': False,
             'correct': False,
             'reason': 'conflict',
-            'message': 'This number conflicts with existing numbers!'
-        })
-
-    # Check if this move makes the puzzle unsolvable
-    test_board = Board()
-    for r in range(9):
-        for c in range(9):
-            if current_board[r][c] != 0:
-                if (r, c) == (row, col):
-                    test_board.update(r, c, value)
-                else:
-                    test_board.update(r, c, current_board[r][c])
+            'message': 'This number conflicts with existing numbers!',
+            'conflicts': sorted(conflicts)
+        }
+        return (response, 200), None
+
+    # Board to check for solvability, with the move placed. Its analysis is
+    # cached, so re-checking a board state (or hinting on it) is free
+    test_grid = [row_values[:] for row_values in current_board]
+    test_grid[row][col] = value
+
+    return None, {
+        'session': session,
+        'move': move,
+        'seq': seq,
+        'correct': is_correct,
+        'delta_mode': delta_mode,
+        'grid': test_grid,
+        'difficulty': session['difficulty'],
+        'analysis': session['analysis'].get(test_grid)
+    }
 
-    is_solvable = DFS(copy.deepcopy(test_board)) is not None
 
-    if not is_solvable:
-        return jsonify({
+def finish_validation(pending: dict, solvable: bool) -> Tuple[dict, int]:
+    """
+    Second half of move validation, once is_solvable has run (or
+    pending['analysis'].solvable already had the answer). If another move
+    reached the board in the meantime, the checks are stale and the client
+    gets the 409 resync instead.
+    """
+    pending['analysis'].solvable = solvable
+    session = pending['session']
+
+    if pending['delta_mode']:
+        with session['lock']:
+            stale = out_of_sync(session, {'seq': pending['seq']})
+            if stale:
+                return stale
+            if solvable:
+                seq = apply_move(session, *pending['move'])
+
+    if not solvable:
+        response = {
             'valid': False,
-            'correct': is_correct,
+            'correct': pending['correct'],
             'reason': 'unsolvable',
             'message': 'This move makes the puzzle unsolvable!'
-        })
+        }
+    else:
+        response = {
+            'valid': True,
+            'correct': pending['correct'],
+            'reason': 'valid'
+        }
+        if pending['delta_mode']:
+            response['seq'] = seq
 
-    return jsonify({
-        'valid': True,
-        'correct': is_correct,
-        'reason': 'valid'
-    })
+    return response, 200
 
 
-@app.route('/api/solve', methods=['POST'])
-def solve_puzzle():
+def handle_move(data: dict) -> Tuple[dict, int]:
+    """Apply an unvalidated move to the session's board"""
+    session = get_session(data.get('session_id'))
+
+    if session is None:
+        return {'error': 'Invalid session'}, 400
+
+    move = parse_move(session, data)
+    if move is None:
+        return {'error': 'Invalid move'}, 400
+
+    with session['lock']:
+        stale = out_of_sync(session, data)
+        if stale:
+            return stale
+
+        return {'seq': apply_move(session, *move)}, 200
+
+
+def handle_undo(data: dict) -> Tuple[dict, int]:
+    """Revert the most recent move on the session's board"""
+    session = get_session(data.get('session_id'))
+
+    if session is None:
+        return {'error': 'Invalid session'}, 400
+
+    with session['lock']:
+        stale = out_of_sync(session, data)
+        if stale:
+            return stale
+
+        if not session['history']:
+            return {'error': 'Nothing to undo'}, 400
+
+        row, col, old_value = session['history'].pop()
+        session['board'][row][col] = old_value
+        session['seq'] += 1
+
+    return {
+        'row': row,
+        'col': col,
+        'value': old_value,
+        'seq': session['seq']
+    }, 200
+
+
+def handle_solve(data: dict) -> Tuple[dict, int]:
+    """Return the stored solution for a session (which ends the game)"""
+    session = get_session(data.get('session_id'))
+
+    if session is None:
+        return {'error': 'Invalid session'}, 400
+
+    solution = session['solution']
+    session['analysis'].clear()
+
+    return {
+        'solution': solution
+    }, 200
+
+
+def handle_hint(data: dict) -> Tuple[dict, int]:
     """
-    Solve the current puzzle
-    Request: {"session_id": str}
+    Find the easiest logical next step on the session's (or the supplied)
+    board. Falls back to revealing a cell from the solution when no
+    technique applies.
     """
-    data = request.json
-    session_id = data.get('session_id')
+    session = get_session(data.get('session_id'))
 
-    if session_id not in game_sessions:
-        return jsonify({'error': 'Invalid session'}), 400
+    if session is None:
+        return {'error': 'Invalid session'}, 400
 
-    solution = game_sessions[session_id]['solution']
+    current_board = data.get('current_board') or session['board']
+    solution = session['solution']
+    analysis = session['analysis'].get(current_board)
 
-    return jsonify({
-        'solution': solution
-    })
+    if analysis.complete:
+        return {'error': 'No empty cells to hint'}, 400
 
+    if analysis.hint:
+        return dict(analysis.hint), 200
 
-@app.route('/api/hint', methods=['POST'])
-def get_hint():
+    # Reveal the most constrained cell whose solution value still fits
+    candidates = analysis.candidates
+    fitting = [(len(values), cell) for cell, values in candidates.items()
+               if solution[cell[0]][cell[1]] in values]
+    if fitting:
+        hint_row, hint_col = min(fitting)[1]
+    else:
+        hint_row, hint_col = random.choice(list(candidates))
+
+    return {
+        'row': hint_row,
+        'col': hint_col,
+        'value': solution[hint_row][hint_col],
+        'technique': 'reveal'
+    }, 200
+
+
+def warmup() -> float:
     """
-    Get a hint (reveal one correct cell)
-    Request: {"session_id": str, "current_board": 2D list}
+    Do the one-off work the first request would otherwise pay for: run the
+    solver on a bundled puzzle, analyse a board for hints, compile the page
+    template and build the metrics output. gunicorn.conf.py runs this once in
+    the master before forking, so every worker starts warm and shares the
+    memory copy-on-write.
+    Returns the time taken in seconds.
+    """
+    start = time.perf_counter()
+
+    board = Board()
+    for move in first_puzzle:
+        board.update(*move)
+    grid = [[cell if isinstance(cell, int) else 0 for cell in row] for row in board.rows]
+    DFS(board)
+    AnalysisCache().get(grid).hint
+
+    with app.test_request_context():
+        render_template('index.html')
+    metrics.render()
+
+    return time.perf_counter() - start
+
+
+def profiled(view):
+    """
+    Let admins run a route under the profiler with ?profile=1. Collapsed
+    stacks and cProfile stats are written to PROFILE_DIR, and the top
+    functions by self-time are logged and added to the JSON response, along
+    with which solver ran (a compiled one hides its functions from cProfile).
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.args.get('profile') != '1':
+            return view(*args, **kwargs)
+
+        token = request.headers.get('X-Profile-Token', '')
+        if not PROFILE_TOKEN or not hmac.compare_digest(token, PROFILE_TOKEN):
+            return jsonify({'error': 'Profiling not allowed'}), 403
+
+        # Only needed in this debug path, so imported on demand
+        from profiling import COMPILED_SOLVER_WARNING, profile_call
+
+        result, report = profile_call(view, *args, **kwargs)
+        files = report.write(PROFILE_DIR, request.endpoint)
+        app.logger.warning('Profiled %s in %.0f ms (%s, %s solver)\n%s', request.path,
+                           1000 * report.seconds, files['folded'], SOLVER_IMPLEMENTATION,
+                           report.format_top())
+        if SOLVER_IMPLEMENTATION == 'compiled':
+            app.logger.warning(COMPILED_SOLVER_WARNING)
+
+        response = app.make_response(result)
+        if response.is_json:
+            payload = response.get_json()
+            payload['profile'] = {
+                'seconds': report.seconds,
+                'solver': SOLVER_IMPLEMENTATION,
+                'top_functions': report.top_functions(),
+                'files': files
+            }
+            if SOLVER_IMPLEMENTATION == 'compiled':
+                payload['profile']['warning'] = COMPILED_SOLVER_WARNING
+            response.set_data(app.json.dumps(payload))
+        return response
+
+    return wrapper
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    """Count every request and its latency under its URL rule"""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.observe_request(route, request.method, response.status_code,
+                            time.perf_counter() - g.get('request_start', time.perf_counter()))
+    return response
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics, aggregated across workers in multiprocess mode"""
+    metrics.SESSIONS.set(len(game_sessions))
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+
+@app.route('/')
+def index():
+    """Serve the main game page"""
+    return render_template('index.html', stream_events=app.config['STREAM_EVENTS'])
+
+
+@app.route('/api/new-puzzle', methods=['POST'])
+@profiled
+def new_puzzle():
+    """
+    Generate a new puzzle
+    Request body: {"difficulty": "easy|medium|hard", "stream": bool}
+    With "stream": true (and STREAM_EVENTS on) the session ID is returned at
+    once (202) and the puzzle arrives on /api/events/<session_id>
     """
     data = request.json
-    session_id = data.get('session_id')
-    current_board = data.get('current_board')
+    difficulty = parse_difficulty(data)
 
-    if session_id not in game_sessions:
+    if difficulty is None:
+        return jsonify({'error': 'Invalid difficulty level'}), 400
+
+    if data.get('stream') and app.config['STREAM_EVENTS']:
+        payload, status = start_generation(difficulty)
+        return jsonify(payload), status
+
+    puzzle, solution = PuzzleGenerator.create_puzzle(difficulty)
+    payload, status = start_session(difficulty, puzzle, solution)
+    return jsonify(payload), status
+
+
+@app.route('/api/events/<session_id>')
+def session_events(session_id):
+    """
+    Server-Sent Events stream for a session: "progress" while the puzzle
+    generates, then "puzzle" (or "failed"), after which the stream ends
+    """
+    session = game_sessions.get(session_id)
+    if session is None:
         return jsonify({'error': 'Invalid session'}), 400
 
-    solution = game_sessions[session_id]['solution']
-    initial_puzzle = game_sessions[session_id]['initial_puzzle']
+    last_id = parse_last_event_id(request.headers.get('Last-Event-ID'))
 
-    # Find all empty cells that aren't part of the initial puzzle
-    empty_cells = []
-    for r in range(9):
-        for c in range(9):
-            if current_board[r][c] == 0 and initial_puzzle[r][c] == 0:
-                empty_cells.append((r, c))
+    # 204 tells a reconnecting EventSource there is nothing left to send
+    if stream_finished(session, last_id):
+        return Response(status=204)
 
-    if not empty_cells:
-        return jsonify({'error': 'No empty cells to hint'}), 400
+    return Response(
+        stream_with_context(session['events'].stream(last_id, STREAM_END_EVENTS)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
-    # Pick a random empty cell
-    hint_row, hint_col = random.choice(empty_cells)
-    hint_value = solution[hint_row][hint_col]
 
-    return jsonify({
-        'row': hint_row,
-        'col': hint_col,
-        'value': hint_value
-    })
+@app.route('/api/validate-move', methods=['POST'])
+@profiled
+def validate_move():
+    """
+    Validate if a move makes the board unsolvable
+    Request: {"session_id": str, "row": int, "col": int, "value": int, "seq": int}
+
+    The move is checked against the server's copy of the board and, if valid,
+    applied to it. Legacy clients may still send "current_board" (2D list)
+    instead of "seq"; that board is then used as-is and nothing is stored.
+    """
+    result, pending = prepare_validation(request.json)
+    if result is None:
+        solvable = pending['analysis'].solvable
+        if solvable is None:
+            solvable = is_solvable(pending['grid'], pending['difficulty'])
+        result = finish_validation(pending, solvable)
+
+    payload, status = result
+    return jsonify(payload), status
+
+
+@app.route('/api/move', methods=['POST'])
+def record_move():
+    """
+    Apply a move to the server's board without validating it (erasing a
+    cell, accepting a hint, replaying a redo). A value of 0 clears the cell.
+    Request: {"session_id": str, "row": int, "col": int, "value": int, "seq": int}
+    """
+    payload, status = handle_move(request.json)
+    return jsonify(payload), status
+
+
+@app.route('/api/undo', methods=['POST'])
+def undo_move():
+    """
+    Revert the most recent move on the server's board
+    Request: {"session_id": str, "seq": int}
+    Returns the reverted cell and its restored value
+    """
+    payload, status = handle_undo(request.json)
+    return jsonify(payload), status
+
+
+@app.route('/api/solve', methods=['POST'])
+def solve_puzzle():
+    """
+    Solve the current puzzle
+    Request: {"session_id": str}
+    """
+    payload, status = handle_solve(request.json)
+    return jsonify(payload), status
+
+
+@app.route('/api/hint', methods=['POST'])
+@profiled
+def get_hint():
+    """
+    Get a hint (reveal one correct cell)
+    Request: {"session_id": str}
+    The hint is computed on the server's board; legacy clients may pass
+    "current_board" (2D list) instead. The hint is not applied - the client
+    confirms it with /api/move.
+    """
+    payload, status = handle_hint(request.json)
+    return jsonify(payload), status
+
+
+def check_sessions() -> None:
+    """
+    Assert suites for the move protocol (seq, 409 resync, undo, the session
+    lock), run with python app.py --check
+    """
+    client = app.test_client()
+    solution = generate_grid(random.Random(26))
+    puzzle = [row[:] for row in solution]
+    for r, c in [(0, 0), (0, 1), (4, 4), (8, 8)]:
+        puzzle[r][c] = 0
+
+    def play() -> str:
+        payload, _ = start_session('easy', [row[:] for row in puzzle], solution)
+        return payload['session_id']
+
+    def post(path: str, **body) -> Tuple[dict, int]:
+        response = client.post(path, json=body)
+        return response.get_json(), response.status_code
+
+    # stale seq: 409 with the server's board and seq
+    session_id = play()
+    payload, status = post('/api/move', session_id=session_id, row=0, col=0,
+                           value=solution[0][0], seq=0)
+    assert status == 200 and payload == {'seq': 1}, "seq test 1"
+    payload, status = post('/api/move', session_id=session_id, row=0, col=1,
+                           value=solution[0][1], seq=0)
+    assert status == 409 and payload['seq'] == 1, "seq test 2"
+    assert payload['board'] == game_sessions[session_id]['board'], "seq test 3"
+    assert payload['board'][0][1] == 0, "seq test 4"
+    print("seq test suite passed")
+
+    # undo: restores the previous value and counts as a move
+    payload, status = post('/api/undo', session_id=session_id, seq=1)
+    assert status == 200 and payload == {'row': 0, 'col': 0, 'value': 0, 'seq': 2}, \
+        "undo test 1"
+    assert game_sessions[session_id]['board'][0][0] == 0, "undo test 2"
+    payload, status = post('/api/undo', session_id=session_id, seq=2)
+    assert status == 400, "undo test 3"
+    payload, status = post('/api/undo', session_id=session_id, seq=1)
+    assert status == 409 and payload['seq'] == 2, "undo test 4"
+    print("undo test suite passed")
+
+    # validate-move: clearing a cell and changing a given are rejected
+    session_id = play()
+    payload, status = post('/api/validate-move', session_id=session_id, row=0, col=0,
+                           value=0, seq=0)
+    assert status == 400, "validate test 1"
+    payload, status = post('/api/validate-move', session_id=session_id, row=0, col=2,
+                           value=solution[0][2], seq=0)
+    assert status == 400, "validate test 2"
+    payload, status = post('/api/validate-move', session_id=session_id, row=0, col=0,
+                           value=solution[0][0], seq=0)
+    assert status == 200 and payload['valid'] and payload['seq'] == 1, "validate test 3"
+    assert game_sessions[session_id]['board'][0][0] == solution[0][0], "validate test 4"
+
+    # a second validate-move sent with the same seq is stale
+    payload, status = post('/api/validate-move', session_id=session_id, row=0, col=1,
+                           value=solution[0][1], seq=0)
+    assert status == 409 and payload['seq'] == 1, "validate test 5"
+    print("validate-move test suite passed")
+
+    # legacy current_board: checked as sent, the stored board is left alone
+    session_id = play()
+    board = [row[:] for row in puzzle]
+    board[4][4] = solution[4][4]
+    payload, status = post('/api/validate-move', session_id=session_id, row=0, col=0,
+                           value=solution[0][0], current_board=board)
+    assert status == 200 and payload['valid'] and 'seq' not in payload, "legacy test 1"
+    assert game_sessions[session_id]['board'] == puzzle, "legacy test 2"
+    assert game_sessions[session_id]['seq'] == 0, "legacy test 3"
+    print("legacy board test suite passed")
+
+    # two validations prepared on the same seq (concurrent requests): the
+    # first applies, the second is rejected once it reaches the lock
+    session_id = play()
+    _, first = prepare_validation({'session_id': session_id, 'row': 0, 'col': 0,
+                                   'value': solution[0][0], 'seq': 0})
+    _, second = prepare_validation({'session_id': session_id, 'row': 0, 'col': 1,
+                                    'value': solution[0][1], 'seq': 0})
+    payload, status = finish_validation(first, True)
+    assert status == 200 and payload['seq'] == 1, "lock test 1"
+    payload, status = finish_validation(second, True)
+    assert status == 409 and payload['seq'] == 1, "lock test 2"
+    assert game_sessions[session_id]['board'][0][1] == 0, "lock test 3"
+    assert len(game_sessions[session_id]['history']) == 1, "lock test 4"
+    print("session lock test suite passed")
+
+    print("all session test suites passed")
 
 
 if __name__ == '__main__':
+    if sys.argv[1:] == ['--check']:
+        check_sessions()
+        sys.exit(0)
+
+    # The development server runs a thread per request, so streams are fine
+    app.config['STREAM_EVENTS'] = True
     app.run(debug=True, port=5000)
@@ -0,0 +1,228 @@
+"""
+Sudoku Web Application - ASGI entry point
+Serves the same API handlers as app.py on an event loop. Cheap endpoints run
+inline on the loop; puzzle generation and solvability checks are offloaded to
+a process pool so they never block other connections, streamed generation
+included. Event streams wait on the loop too, so clients stream puzzle
+generation in this mode.
+
+Run with:
+    uvicorn asgi:app --port 8000
+    WEB_CONCURRENCY=4 gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+"""
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from json import JSONDecodeError
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+import app as sudoku
+import metrics
+from events import parse_last_event_id
+
+# Server worker processes, each with its own solver pool. WEB_CONCURRENCY is
+# gunicorn's default worker count; run-asgi.sh sets it
+SERVER_WORKERS = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+
+# Number of processes used for solver-heavy work (per server worker); by
+# default the CPUs are shared out between the workers
+SOLVER_PROCESSES = int(os.environ.get('SOLVER_PROCESSES',
+                                      max(1, (os.cpu_count() or 1) // SERVER_WORKERS)))
+
+# Cells a streamed generation tries to remove per trip to the solver pool;
+# progress is published after each trip
+REMOVAL_CHUNK = 9
+
+# An idle stream costs no thread here (see session_events)
+sudoku.app.config['STREAM_EVENTS'] = True
+
+solver_pool = None
+
+# Streamed generations in progress (the loop only keeps weak references)
+generation_tasks = set()
+
+
+@asynccontextmanager
+async def lifespan(application):
+    """Start the solver pool with the server and shut it down afterwards"""
+    global solver_pool
+    solver_pool = ProcessPoolExecutor(max_workers=SOLVER_PROCESSES)
+    try:
+        yield
+    finally:
+        solver_pool.shutdown(cancel_futures=True)
+
+
+async def offload(func, *args):
+    """Run a solver-heavy function in the process pool; its solver and
+    generator metrics are recorded here rather than in the pool process"""
+    loop = asyncio.get_running_loop()
+    result, observations = await loop.run_in_executor(solver_pool, metrics.collect,
+                                                      func, *args)
+    metrics.replay(observations)
+    return result
+
+
+async def read_json(request) -> dict:
+    """Parse the request body, treating a missing or malformed body as {}"""
+    try:
+        data = await request.json()
+    except (JSONDecodeError, UnicodeDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def respond(result) -> JSONResponse:
+    """Turn a handler's (payload, status) into a response"""
+    payload, status = result
+    return JSONResponse(payload, status_code=status)
+
+
+async def new_puzzle(request):
+    data = await read_json(request)
+    difficulty = sudoku.parse_difficulty(data)
+
+    if difficulty is None:
+        return JSONResponse({'error': 'Invalid difficulty level'}, status_code=400)
+
+    if data.get('stream'):
+        payload, status = sudoku.new_streamed_session(difficulty)
+        task = asyncio.create_task(generate_streamed(payload['session_id'], difficulty))
+        generation_tasks.add(task)
+        task.add_done_callback(generation_tasks.discard)
+        return JSONResponse(payload, status_code=status)
+
+    puzzle, solution = await offload(sudoku.PuzzleGenerator.create_puzzle, difficulty)
+    return respond(sudoku.start_session(difficulty, puzzle, solution))
+
+
+async def generate_streamed(session_id: str, difficulty: str) -> None:
+    """
+    Same as app.start_generation's thread, but every solver step runs in the
+    process pool: the solution first, then the cell removals REMOVAL_CHUNK
+    cells at a time, publishing progress from the loop in between
+    """
+    generator = sudoku.PuzzleGenerator
+    report = sudoku.progress_reporter(session_id)
+    target = sudoku.DIFFICULTY_LEVELS[difficulty]
+    try:
+        solution = await offload(generator.generate_solution, difficulty)
+        puzzle = [row[:] for row in solution]
+        positions = generator.removal_order()
+        removed = 0
+        for start in range(0, len(positions), REMOVAL_CHUNK):
+            if removed >= target:
+                break
+            puzzle, removed = await offload(generator.remove_cells, puzzle,
+                                            positions[start:start + REMOVAL_CHUNK],
+                                            removed, difficulty)
+            report(removed, target)
+    except Exception:
+        sudoku.publish_failure(session_id)
+        return
+
+    sudoku.publish_puzzle(session_id, puzzle, solution)
+
+
+async def validate_move(request):
+    result, pending = sudoku.prepare_validation(await read_json(request))
+    if result is None:
+        solvable = pending['analysis'].solvable
+        if solvable is None:
+            solvable = await offload(sudoku.is_solvable, pending['grid'],
+                                     pending['difficulty'])
+        result = sudoku.finish_validation(pending, solvable)
+
+    return respond(result)
+
+
+async def session_events(request):
+    """Same stream as app.session_events, waiting on the event loop"""
+    session = sudoku.game_sessions.get(request.path_params['session_id'])
+    if session is None:
+        return JSONResponse({'error': 'Invalid session'}, status_code=400)
+
+    last_id = parse_last_event_id(request.headers.get('Last-Event-ID'))
+    if sudoku.stream_finished(session, last_id):
+        return Response(status_code=204)
+
+    return StreamingResponse(
+        session['events'].stream_async(last_id, sudoku.STREAM_END_EVENTS),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def render_page() -> str:
+    """The game page, rendered once by the Flask app's template"""
+    with sudoku.app.test_request_context('/'):
+        return sudoku.index()
+
+
+async def index(request):
+    return HTMLResponse(render_page())
+
+
+async def metrics_endpoint(request):
+    """Same as app.metrics_endpoint"""
+    metrics.SESSIONS.set(len(sudoku.game_sessions))
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+
+def timed(route: str, endpoint):
+    """Record request metrics for a route (app.py's Flask hooks don't run here)"""
+    async def wrapper(request):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await endpoint(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.observe_request(route, request.method, status,
+                                    time.perf_counter() - start)
+    return wrapper
+
+
+def api_route(path: str, endpoint) -> Route:
+    return Route(path, timed(path, endpoint), methods=['POST'])
+
+
+def inline(handler):
+    """Serve a cheap handler directly on the event loop"""
+    async def endpoint(request):
+        return respond(handler(await read_json(request)))
+    return endpoint
+
+
+app = Starlette(
+    routes=[
+        api_route('/api/new-puzzle', new_puzzle),
+        api_route('/api/validate-move', validate_move),
+        api_route('/api/move', inline(sudoku.handle_move)),
+        api_route('/api/undo', inline(sudoku.handle_undo)),
+        api_route('/api/solve', inline(sudoku.handle_solve)),
+        api_route('/api/hint', inline(sudoku.handle_hint)),
+        Route('/api/events/{session_id}',
+              timed('/api/events/<session_id>', session_events), methods=['GET']),
+        Route('/', timed('/', index)),
+        Route('/metrics', timed('/metrics', metrics_endpoint)),
+        Mount('/static', StaticFiles(directory=sudoku.app.static_folder)),
+    ],
+    # Same policy as flask_cors' defaults in app.py
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'],
+                           allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
@@ -0,0 +1,151 @@
+"""
+Sudoku Web Application - optional compiled solver
+Compiles the solver core ('Assignment 8'/Assignment8.py and stack_and_queue.py)
+to C extension modules with mypyc. They are built in place, next to the
+sources, so solver_core picks them up on the next start; without them (or with
+SUDOKU_PURE_SOLVER=1) the pure-Python solver runs as before. The build records
+the hash of each source in 'Assignment 8'/solver_build.json; once a source is
+edited solver_core warns and runs the pure-Python solver until the next build.
+
+    pip install mypy setuptools
+    python build_solver.py            # compile, then run the parity check
+    python build_solver.py --check    # compiled and pure results must match
+    python build_solver.py --clean    # remove the compiled modules
+
+The parity check solves a fixed corpus (the bundled test puzzles plus seeded
+generated ones at every difficulty) with both implementations and asserts the
+same solutions and the same number of expanded search states. Without a
+current build it is skipped (and passes), so it can run routinely; after
+building it is required to run.
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from grid_generator import generate_grids
+import solver_core
+from solver_core import BUILD_RECORD, SOLVER_DIR, SOLVER_SOURCES, load_pure_solver, source_hashes
+
+# Cells removed per corpus puzzle (the app's easy, medium and hard levels),
+# generated puzzles per level, and the seed they are generated from
+CORPUS_REMOVALS = (30, 45, 55)
+CORPUS_SIZE = 20
+CORPUS_SEED = 35
+
+# Node budget per solve, as in the app
+MAX_NODES = 200000
+
+
+def build() -> None:
+    """Compile SOLVER_SOURCES in place with mypyc and record their hashes"""
+    from mypyc.build import mypycify
+    from setuptools import setup
+
+    cwd = os.getcwd()
+    os.chdir(SOLVER_DIR)
+    try:
+        setup(name='sudoku-solver-core', ext_modules=mypycify(SOLVER_SOURCES, opt_level='3'),
+              script_args=['build_ext', '--inplace'])
+    finally:
+        os.chdir(cwd)
+
+    with open(BUILD_RECORD, 'w') as record:
+        json.dump(source_hashes(), record, indent=2)
+
+
+def clean() -> None:
+    """Remove the compiled modules, their build record and build directory"""
+    for path in glob.glob(os.path.join(SOLVER_DIR, '*.so')) \
+            + glob.glob(os.path.join(SOLVER_DIR, '*.pyd')) \
+            + glob.glob(BUILD_RECORD):
+        os.remove(path)
+        print(f'removed {path}')
+    shutil.rmtree(os.path.join(SOLVER_DIR, 'build'), ignore_errors=True)
+
+
+def corpus(first_puzzle: list, second_puzzle: list) -> List[Tuple[str, list]]:
+    """The puzzles to compare on, as (name, list of (row, col, value) moves)"""
+    puzzles = [('first_puzzle', first_puzzle), ('second_puzzle', second_puzzle)]
+
+    rng = random.Random(CORPUS_SEED)
+    for removals in CORPUS_REMOVALS:
+        for i, grid in enumerate(generate_grids(CORPUS_SIZE, rng)):
+            cells = [(r, c) for r in range(9) for c in range(9)]
+            removed = set(rng.sample(cells, removals))
+            moves = [(r, c, grid[r][c]) for r, c in cells if (r, c) not in removed]
+            puzzles.append((f'{removals} removed #{i}', moves))
+    return puzzles
+
+
+def solve(solver, moves: list) -> Tuple[list, dict, float]:
+    """Solve with the given solver module; returns (rows, stats, seconds)"""
+    board = solver.Board()
+    for move in moves:
+        board.update(*move)
+
+    stats: dict = {}
+    start = time.perf_counter()
+    solved = solver.DFS(board, stats, MAX_NODES)
+    seconds = time.perf_counter() - start
+    return (solved.rows if solved else None), stats, seconds
+
+
+def check(require_build: bool = False) -> bool:
+    """Solve the corpus with both implementations and compare the results.
+    When the compiled solver isn't in use the check is skipped, which counts
+    as passing unless require_build is set."""
+    if solver_core.SOLVER_IMPLEMENTATION != 'compiled':
+        print(f'Parity check skipped, the compiled solver is not in use: '
+              f'{solver_core.SOLVER_FALLBACK_REASON or "not built"} (run python build_solver.py)')
+        return not require_build
+    compiled = solver_core.solver
+    pure = load_pure_solver('pure_Assignment8')
+
+    compiled_seconds = pure_seconds = 0.0
+    puzzles = corpus(pure.first_puzzle, pure.second_puzzle)
+    for name, moves in puzzles:
+        expected, expected_stats, seconds = solve(pure, moves)
+        pure_seconds += seconds
+        rows, stats, seconds = solve(compiled, moves)
+        compiled_seconds += seconds
+
+        assert rows == expected, f'{name}: solutions differ'
+        assert stats == expected_stats, f'{name}: {stats} != {expected_stats}'
+
+    print(f'{len(puzzles)} puzzles solved identically; '
+          f'pure {1000 * pure_seconds:.0f} ms, compiled {1000 * compiled_seconds:.0f} ms '
+          f'({pure_seconds / compiled_seconds:.1f}x)')
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build the compiled sudoku solver core')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--check', action='store_true', help='only run the parity check')
+    group.add_argument('--clean', action='store_true', help='remove the compiled modules')
+    parser.add_argument('--require-build', action='store_true',
+                        help='with --check, fail instead of skipping when the compiled '
+                             'solver is not in use')
+    args = parser.parse_args()
+
+    if args.clean:
+        clean()
+        return
+    if not args.check:
+        build()
+        # solver_core already imported the old solver here; check in a fresh process
+        sys.exit(subprocess.call([sys.executable, os.path.abspath(__file__),
+                                  '--check', '--require-build']))
+    sys.exit(0 if check(args.require_build) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Sudoku Web Application - server-push events
+A small per-session event log that request handlers publish to and
+Server-Sent Events streams read from. Streams can be read from a worker
+thread (stream) or an event loop (stream_async).
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import (Any, AsyncIterator, Callable, Dict, Iterator, List, Optional,
+                    Sequence, Tuple)
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+
+class EventChannel:
+    """Holds the most recent events of one game session. Every event gets an
+    increasing id so a reconnecting client (Last-Event-ID) only receives what
+    it missed.
+
+    Attributes:
+        events - deque of (id, event name, data), oldest first
+        last_id - id of the most recently published event
+        last_ids - dict of event name -> id of its latest publication
+        condition - wakes up streams waiting for new events
+        listeners - callbacks run on every publish (wakes async streams)
+    """
+
+    def __init__(self, max_events: int = 100):
+        self.events = deque(maxlen=max_events)
+        self.last_id = 0
+        self.last_ids: Dict[str, int] = {}
+        self.condition = threading.Condition()
+        self.listeners: List[Callable[[], None]] = []
+
+    def publish(self, event: str, data: Any) -> None:
+        """Add an event and wake up all listening streams"""
+        with self.condition:
+            self.last_id += 1
+            self.events.append((self.last_id, event, data))
+            self.last_ids[event] = self.last_id
+            self.condition.notify_all()
+            listeners = list(self.listeners)
+
+        for listener in listeners:
+            listener()
+
+    def since(self, after_id: int) -> List[Tuple[int, str, Any]]:
+        """Events newer than after_id"""
+        with self.condition:
+            return [item for item in self.events if item[0] > after_id]
+
+    def wait(self, after_id: int, timeout: float) -> List[Tuple[int, str, Any]]:
+        """Return events newer than after_id, blocking up to timeout seconds
+        for one to arrive; [] on timeout"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.last_id > after_id, timeout)
+            return [item for item in self.events if item[0] > after_id]
+
+    async def wait_async(self, after_id: int, timeout: float) -> List[Tuple[int, str, Any]]:
+        """wait for use on an event loop: suspends instead of blocking a thread"""
+        loop = asyncio.get_running_loop()
+        arrived = asyncio.Event()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(arrived.set)
+
+        with self.condition:
+            if self.last_id > after_id:
+                return [item for item in self.events if item[0] > after_id]
+            self.listeners.append(wake)
+
+        try:
+            await asyncio.wait_for(arrived.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.condition:
+                self.listeners.remove(wake)
+
+        return self.since(after_id)
+
+    def finished(self, after_id: int, until: Sequence[str]) -> bool:
+        """True if one of the `until` events was published at or before
+        after_id, i.e. a client that has seen after_id already has it"""
+        with self.condition:
+            return any(0 < self.last_ids.get(event, 0) <= after_id for event in until)
+
+    def stream(self, after_id: int = 0, until: Sequence[str] = ()) -> Iterator[str]:
+        """Yield the channel as text/event-stream chunks, ending once one of
+        the `until` events has been sent (never, if until is empty)"""
+        # Ask the browser to wait a little before reconnecting
+        yield 'retry: 2000\n\n'
+        while not self.finished(after_id, until):
+            pending = self.wait(after_id, KEEPALIVE_INTERVAL)
+            if not pending:
+                yield ': keepalive\n\n'
+            for event_id, event, data in pending:
+                yield format_event(event_id, event, data)
+                after_id = event_id
+
+    async def stream_async(self, after_id: int = 0,
+                           until: Sequence[str] = ()) -> AsyncIterator[str]:
+        """stream for use on an event loop"""
+        yield 'retry: 2000\n\n'
+        while not self.finished(after_id, until):
+            pending = await self.wait_async(after_id, KEEPALIVE_INTERVAL)
+            if not pending:
+                yield ': keepalive\n\n'
+            for event_id, event, data in pending:
+                yield format_event(event_id, event, data)
+                after_id = event_id
+
+
+def format_event(event_id: int, event: str, data: Any) -> str:
+    """One event in text/event-stream format"""
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """Read a Last-Event-ID header, treating anything unexpected as 0"""
+    try:
+        return max(0, int(value or 0))
+    except ValueError:
+        return 0
@@ -0,0 +1,186 @@
+"""
+Sudoku Web Application - solved grid generator
+Fills an empty board with randomized backtracking (random value order,
+most-constrained cell first) on row/column/box bitmasks. Each attempt gives up
+after a node cutoff and the next one starts over with a doubled cutoff
+(Las Vegas restarts), so a rare unlucky search can't run away. Grids are
+produced as a stream for bulk use.
+"""
+
+import random
+from typing import Iterator, List, Optional
+
+# Bits 1-9 set: every digit still available
+ALL_DIGITS = 0b1111111110
+
+# Nodes (digit placements) the first attempt may use; an empty board needs 81
+INITIAL_CUTOFF = 500
+
+# Attempts per grid before giving up; the cutoff doubles after each one
+MAX_RESTARTS = 12
+
+BOX_OF = [3 * (i // 27) + (i % 9) // 3 for i in range(81)]
+
+
+def fill_grid(rng: random.Random, max_nodes: int, stats: dict) -> Optional[List[List[int]]]:
+    """Make one attempt at filling an empty board
+
+    Args:
+        rng - random number generator used to order the digits
+        max_nodes - placements to try before abandoning the attempt
+        stats - dict whose "nodes" count is increased by the placements made
+
+    Returns:
+        the completed board as a 2D list, or None if the cutoff was hit
+    """
+    cells = [0] * 81
+    rows = [0] * 9
+    cols = [0] * 9
+    boxes = [0] * 9
+
+    def place(i: int, digit: int) -> None:
+        bit = 1 << digit
+        cells[i] = digit
+        rows[i // 9] |= bit
+        cols[i % 9] |= bit
+        boxes[BOX_OF[i]] |= bit
+
+    def clear(i: int) -> None:
+        bit = ~(1 << cells[i])
+        cells[i] = 0
+        rows[i // 9] &= bit
+        cols[i % 9] &= bit
+        boxes[BOX_OF[i]] &= bit
+
+    # stack of (cell index, digits not yet tried there)
+    stack = []
+    nodes = 0
+    while True:
+        # choose the empty cell with the fewest digits left
+        best, best_mask, best_count = None, 0, 10
+        for i in range(81):
+            if cells[i] == 0:
+                mask = ALL_DIGITS & ~(rows[i // 9] | cols[i % 9] | boxes[BOX_OF[i]])
+                count = mask.bit_count()
+                if count < best_count:
+                    best, best_mask, best_count = i, mask, count
+                    if count <= 1:
+                        break
+
+        if best is None:
+            stats['nodes'] = stats.get('nodes', 0) + nodes
+            return [cells[r * 9:r * 9 + 9] for r in range(9)]
+
+        digits = [d for d in range(1, 10) if best_mask >> d & 1]
+        rng.shuffle(digits)
+        stack.append((best, digits))
+
+        # try the next digit on top of the stack, backtracking past dead ends
+        while stack:
+            i, remaining = stack[-1]
+            if cells[i]:
+                clear(i)
+            if remaining:
+                place(i, remaining.pop())
+                nodes += 1
+                break
+            stack.pop()
+        else:
+            break
+
+        if nodes >= max_nodes:
+            break
+
+    stats['nodes'] = stats.get('nodes', 0) + nodes
+    return None
+
+
+def generate_grids(count: Optional[int] = None, rng: Optional[random.Random] = None,
+                   stats: Optional[dict] = None) -> Iterator[List[List[int]]]:
+    """Yield complete, valid sudoku grids
+
+    Args:
+        count - how many grids to produce (None for an endless stream)
+        rng - random number generator, e.g. random.Random(seed) for a
+            reproducible stream (a fresh one is made if not given)
+        stats - optional dict, kept up to date with "nodes" (placements
+            made), "restarts" (abandoned attempts) and "timed_out" (always
+            False, for symmetry with Assignment8.DFS)
+
+    Raises:
+        RuntimeError if a grid still can't be completed after MAX_RESTARTS
+        attempts (practically never happens)
+    """
+    rng = rng or random.Random()
+    stats = {} if stats is None else stats
+    stats.setdefault('nodes', 0)
+    stats.setdefault('restarts', 0)
+    stats['timed_out'] = False
+
+    produced = 0
+    while count is None or produced < count:
+        cutoff = INITIAL_CUTOFF
+        for _ in range(MAX_RESTARTS):
+            grid = fill_grid(rng, cutoff, stats)
+            if grid:
+                break
+            stats['restarts'] += 1
+            cutoff *= 2
+        else:
+            raise RuntimeError(f'No grid after {MAX_RESTARTS} attempts')
+
+        produced += 1
+        yield grid
+
+
+def generate_grid(rng: Optional[random.Random] = None,
+                  stats: Optional[dict] = None) -> List[List[int]]:
+    """Return a single complete grid (see generate_grids)"""
+    return next(generate_grids(1, rng, stats))
+
+
+if __name__ == "__main__":
+    def is_valid(grid):
+        units = [row for row in grid] + [[grid[r][c] for r in range(9)] for c in range(9)] \
+            + [[grid[br + r][bc + c] for r in range(3) for c in range(3)]
+               for br in (0, 3, 6) for bc in (0, 3, 6)]
+        return len(grid) == 9 and all(sorted(unit) == list(range(1, 10)) for unit in units)
+
+    # every grid is a valid sudoku solution
+    stats = {}
+    grids = list(generate_grids(200, random.Random(32), stats))
+    assert len(grids) == 200, "valid grid test 1"
+    assert all(is_valid(grid) for grid in grids), "valid grid test 2"
+    assert stats['nodes'] >= 200 * 81 and stats['timed_out'] is False, "valid grid test 3"
+    assert len({str(grid) for grid in grids}) == 200, "valid grid test 4"
+    assert is_valid(generate_grid()), "valid grid test 5"
+    print("valid grid test suite passed")
+
+    # the same seed reproduces the same stream, another seed doesn't
+    assert list(generate_grids(20, random.Random(32))) == grids[:20], "seed test 1"
+    assert list(generate_grids(20, random.Random(33))) != grids[:20], "seed test 2"
+    stream = generate_grids(rng=random.Random(32))
+    assert [next(stream) for _ in range(5)] == grids[:5], "seed test 3"
+    print("seed test suite passed")
+
+    # an attempt that hits its cutoff gives up; the next one gets twice the budget
+    stats = {}
+    assert fill_grid(random.Random(32), 40, stats) is None, "cutoff test 1"
+    assert stats == {'nodes': 40}, "cutoff test 2"
+
+    INITIAL_CUTOFF = 40
+    stats = {}
+    grid = generate_grid(random.Random(32), stats)
+    assert is_valid(grid), "cutoff test 3"
+    # 40 and 80 placements can't fill 81 cells, so at least two restarts
+    assert stats['restarts'] >= 2, "cutoff test 4"
+
+    MAX_RESTARTS = 2
+    try:
+        generate_grid(random.Random(32))
+        assert False, "cutoff test 5"
+    except RuntimeError:
+        pass
+    print("cutoff test suite passed")
+
+    print("all grid generator test suites passed")
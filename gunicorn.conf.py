@@ -0,0 +1,40 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn is started from the
+project root (Procfile, run.sh, run-asgi.sh). Command-line flags still win.
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+
+# Metrics from every worker are written here so /metrics can aggregate them.
+# Cleared on every start so counters from a previous run don't leak in.
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'sudoku-metrics'))
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges (e.g. its session count)"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+# Import the app (and the solver) once in the master; workers are forked from
+# it already loaded instead of each importing everything on its own
+preload_app = True
+
+
+def when_ready(server):
+    """Warm the preloaded app up before the first worker is forked"""
+    from app import warmup
+    from solver_core import SOLVER_IMPLEMENTATION
+    elapsed = warmup()
+    server.log.info('Warm-up finished in %.0f ms (%s solver)', 1000 * elapsed,
+                    SOLVER_IMPLEMENTATION)
+
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers don't write to (and un-share) those pages
+    gc.freeze()
@@ -0,0 +1,302 @@
+"""
+Sudoku Web Application - hint engine
+Finds the easiest logical deduction on a player's board (naked single, hidden
+single, pointing pair) so a hint explains why a number goes where it does.
+Analyses are memoized per board state in a small LRU cache that lives in the
+game session. They keep only their results and the board itself, so a full
+cache costs a session little memory.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Every row, column and 3x3 box as a list of (row, col) cells
+ROWS = [[(r, c) for c in range(9)] for r in range(9)]
+COLS = [[(r, c) for r in range(9)] for c in range(9)]
+BOXES = [[(br + r, bc + c) for r in range(3) for c in range(3)]
+         for br in (0, 3, 6) for bc in (0, 3, 6)]
+UNITS = [('row', unit) for unit in ROWS] + [('column', unit) for unit in COLS] \
+    + [('box', unit) for unit in BOXES]
+
+# Cells sharing a row, column or box with each cell
+PEERS = {
+    (r, c): {cell for unit in (ROWS[r], COLS[c], BOXES[3 * (r // 3) + c // 3])
+             for cell in unit if cell != (r, c)}
+    for r in range(9) for c in range(9)
+}
+
+# Techniques in the order they are tried (easiest first)
+TECHNIQUES = ('naked single', 'hidden single', 'pointing pair')
+
+
+class BoardAnalysis:
+    """The result of analysing one board state
+
+    Attributes:
+        cells - the board as a flat tuple of 81 values, row by row (0 = empty)
+        complete - True if the board has no empty cells
+        contradiction - True if some empty cell has no candidates left (or a
+            digit has nowhere to go in a unit), i.e. the board cannot be solved
+        hint - the easiest deduction as {"row", "col", "value", "technique"},
+            or None if none of TECHNIQUES applies (worked out on first access)
+        solvable - memo slot for a full solvability check, filled in by the
+            caller (None until someone has run the solver on this board)
+    """
+
+    def __init__(self, grid: Tuple[Tuple[int, ...], ...]):
+        self.cells = tuple(value for row in grid for value in row)
+
+        candidates = self.candidates
+        self.complete = not candidates
+        self.contradiction = any(not values for values in candidates.values())
+        for _, unit in UNITS:
+            placed = {self.cells[9 * r + c] for r, c in unit}
+            possible = set().union(*(candidates.get(cell, ()) for cell in unit))
+            if not (placed | possible) >= set(range(1, 10)):
+                self.contradiction = True
+
+        self.solvable: Optional[bool] = False if self.contradiction else None
+        self._hint: Optional[dict] = None
+        self._hint_searched = False
+
+    @property
+    def candidates(self) -> Dict[Tuple[int, int], Set[int]]:
+        """dict of (row, col) -> set of values still possible for every empty
+        cell, after ruling out placed peers. Worked out again on every access
+        rather than kept, since cached analyses would otherwise hold them all"""
+        cells = self.cells
+        candidates = {}
+        for r in range(9):
+            for c in range(9):
+                if cells[9 * r + c] == 0:
+                    taken = {cells[9 * pr + pc] for pr, pc in PEERS[(r, c)]}
+                    candidates[(r, c)] = set(range(1, 10)) - taken
+        return candidates
+
+    @property
+    def hint(self) -> Optional[dict]:
+        """The easiest deduction on this board, searched for once"""
+        if not self._hint_searched:
+            self._hint = None if self.contradiction else self.find_deduction()
+            self._hint_searched = True
+        return self._hint
+
+    def find_deduction(self) -> Optional[dict]:
+        """Try each technique in turn and return the first cell it places"""
+        candidates = self.candidates
+        single = self.find_single(candidates)
+        if single:
+            return single
+
+        # Pointing pairs only remove candidates; report the single they expose
+        while self.eliminate_pointing(candidates):
+            single = self.find_single(candidates)
+            if single:
+                return dict(single, technique='pointing pair')
+
+        return None
+
+    def find_single(self, candidates: Optional[Dict[Tuple[int, int], Set[int]]] = None
+                    ) -> Optional[dict]:
+        """Find a naked single (cell with one candidate) or a hidden single
+        (value with one possible cell in a unit)"""
+        candidates = self.candidates if candidates is None else candidates
+
+        for (r, c), values in sorted(candidates.items()):
+            if len(values) == 1:
+                return {'row': r, 'col': c, 'value': next(iter(values)),
+                        'technique': 'naked single'}
+
+        for unit_name, unit in UNITS:
+            for value in range(1, 10):
+                spots = [cell for cell in unit if value in candidates.get(cell, ())]
+                if len(spots) == 1:
+                    r, c = spots[0]
+                    return {'row': r, 'col': c, 'value': value,
+                            'technique': 'hidden single', 'unit': unit_name}
+
+        return None
+
+    @staticmethod
+    def eliminate_pointing(candidates: Dict[Tuple[int, int], Set[int]]) -> bool:
+        """When a value's only spots in a box share a row or column, remove it
+        from the rest of that row/column. Returns True if anything changed."""
+        changed = False
+        for box in BOXES:
+            for value in range(1, 10):
+                spots = [cell for cell in box if value in candidates.get(cell, ())]
+                if len(spots) < 2:
+                    continue
+
+                if len({r for r, _ in spots}) == 1:
+                    line = ROWS[spots[0][0]]
+                elif len({c for _, c in spots}) == 1:
+                    line = COLS[spots[0][1]]
+                else:
+                    continue
+
+                for cell in line:
+                    if cell not in spots and value in candidates.get(cell, ()):
+                        candidates[cell].discard(value)
+                        changed = True
+        return changed
+
+
+class AnalysisCache:
+    """Bounded LRU cache of BoardAnalysis keyed by board state
+
+    Attributes:
+        max_entries - how many board states to keep before evicting the
+            least recently used one
+        entries - OrderedDict of BoardAnalysis.cells -> BoardAnalysis
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[int, ...], BoardAnalysis]" = OrderedDict()
+
+    def get(self, grid: List[List[int]]) -> BoardAnalysis:
+        """Return the analysis of a 2D board, computing it on a miss"""
+        key = tuple(value for row in grid for value in row)
+
+        analysis = self.entries.get(key)
+        if analysis is not None:
+            self.entries.move_to_end(key)
+            return analysis
+
+        analysis = BoardAnalysis(grid)
+        # Keyed by the analysis' own copy of the board, so it is stored once
+        self.entries[analysis.cells] = analysis
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return analysis
+
+    def clear(self) -> None:
+        """Drop every analysis, e.g. once the game is over"""
+        self.entries.clear()
+
+
+if __name__ == "__main__":
+    import random
+    from grid_generator import generate_grids
+
+    def grid_from(rows):
+        return tuple(tuple(row) for row in rows)
+
+    solved = [
+        [5, 3, 4, 6, 7, 8, 9, 1, 2],
+        [6, 7, 2, 1, 9, 5, 3, 4, 8],
+        [1, 9, 8, 3, 4, 2, 5, 6, 7],
+        [8, 5, 9, 7, 6, 1, 4, 2, 3],
+        [4, 2, 6, 8, 5, 3, 7, 9, 1],
+        [7, 1, 3, 9, 2, 4, 8, 5, 6],
+        [9, 6, 1, 5, 3, 7, 2, 8, 4],
+        [2, 8, 7, 4, 1, 9, 6, 3, 5],
+        [3, 4, 5, 2, 8, 6, 1, 7, 9],
+    ]
+
+    # naked single: the first empty cell (row-major) that has one candidate
+    board = [row[:] for row in solved]
+    board[4][4] = 0
+    board[0][0] = 0
+    analysis = BoardAnalysis(grid_from(board))
+    assert analysis.candidates == {(0, 0): {5}, (4, 4): {5}}, "naked single test 1"
+    assert analysis.hint == {'row': 0, 'col': 0, 'value': 5,
+                             'technique': 'naked single'}, "naked single test 2"
+    print("naked single test suite passed")
+
+    # hidden single: 1s in rows 1, 2 and columns 1, 2 leave (0, 0) as the only
+    # place for a 1 in row 0, though the cell itself has many candidates
+    board = [[0] * 9 for _ in range(9)]
+    for r, c in [(1, 3), (2, 6), (3, 1), (4, 2)]:
+        board[r][c] = 1
+    analysis = BoardAnalysis(grid_from(board))
+    assert len(analysis.candidates[(0, 0)]) == 9, "hidden single test 1"
+    assert analysis.hint == {'row': 0, 'col': 0, 'value': 1, 'technique': 'hidden single',
+                             'unit': 'row'}, "hidden single test 2"
+    print("hidden single test suite passed")
+
+    # pointing pair: no single on the board as given; removing the candidates a
+    # box forces onto one line exposes a naked 5 at (5, 7)
+    board = [
+        [0, 0, 0, 0, 0, 0, 3, 0, 0],
+        [0, 0, 0, 0, 0, 6, 1, 0, 0],
+        [5, 0, 4, 1, 3, 2, 0, 6, 0],
+        [0, 0, 0, 0, 0, 0, 0, 7, 0],
+        [0, 0, 0, 0, 0, 9, 0, 3, 0],
+        [0, 0, 9, 0, 2, 0, 0, 0, 0],
+        [0, 0, 0, 2, 4, 8, 0, 1, 3],
+        [0, 4, 2, 0, 0, 0, 5, 8, 0],
+        [0, 8, 1, 0, 0, 0, 0, 0, 4],
+    ]
+    analysis = BoardAnalysis(grid_from(board))
+    assert analysis.find_single() is None, "pointing pair test 1"
+    assert analysis.hint == {'row': 5, 'col': 7, 'value': 5,
+                             'technique': 'pointing pair'}, "pointing pair test 2"
+    # the elimination works on a copy; the board's own candidates are untouched
+    assert analysis.find_single() is None, "pointing pair test 3"
+    print("pointing pair test suite passed")
+
+    # contradiction: (0, 8) has no candidates left
+    board = [[0] * 9 for _ in range(9)]
+    board[0][:8] = [1, 2, 3, 4, 5, 6, 7, 8]
+    board[1][8] = 9
+    analysis = BoardAnalysis(grid_from(board))
+    assert analysis.contradiction and analysis.solvable is False, "contradiction test 1"
+    assert analysis.hint is None, "contradiction test 2"
+
+    # contradiction: every cell has candidates, but row 0 has nowhere for a 1
+    board = [[0] * 9 for _ in range(9)]
+    board[0][6:] = [2, 3, 4]
+    board[1][1] = 1
+    board[2][4] = 1
+    analysis = BoardAnalysis(grid_from(board))
+    assert all(analysis.candidates.values()), "contradiction test 3"
+    assert analysis.contradiction and analysis.solvable is False, "contradiction test 4"
+
+    analysis = BoardAnalysis(grid_from([[0] * 9 for _ in range(9)]))
+    assert not analysis.contradiction and analysis.solvable is None, "contradiction test 5"
+    print("contradiction test suite passed")
+
+    # cache: hits return the same analysis, the least recently used is evicted
+    cache = AnalysisCache(max_entries=2)
+    grid_a = [row[:] for row in solved]
+    grid_b = [row[:] for row in solved]
+    grid_c = [row[:] for row in solved]
+    grid_b[0][0] = 0
+    grid_c[1][1] = 0
+    analysis_a = cache.get(grid_a)
+    assert cache.get(grid_a) is analysis_a, "cache test 1"
+    analysis_b = cache.get(grid_b)
+    cache.get(grid_a)
+    cache.get(grid_c)
+    assert len(cache.entries) == 2, "cache test 2"
+    assert cache.get(grid_a) is analysis_a, "cache test 3"
+    assert cache.get(grid_b) is not analysis_b, "cache test 4"
+    # cached analyses keep their results but not their candidates
+    assert analysis_a.hint is None and 'candidates' not in vars(analysis_a), "cache test 5"
+    cache.clear()
+    assert not cache.entries, "cache test 6"
+    print("analysis cache test suite passed")
+
+    # chained hints: play generated puzzles to the end, every hint must agree
+    # with the grid the puzzle came from (revealing a cell when none applies)
+    rng = random.Random(29)
+    hints_given = 0
+    for grid in generate_grids(30, rng):
+        board = [row[:] for row in grid]
+        for r, c in rng.sample([(r, c) for r in range(9) for c in range(9)], 55):
+            board[r][c] = 0
+        while any(0 in row for row in board):
+            hint = BoardAnalysis(grid_from(board)).hint
+            if hint is None:
+                r, c = next((r, c) for r in range(9) for c in range(9) if board[r][c] == 0)
+                board[r][c] = grid[r][c]
+                continue
+            assert hint['technique'] in TECHNIQUES, "chained hints test 1"
+            assert grid[hint['row']][hint['col']] == hint['value'], "chained hints test 2"
+            board[hint['row']][hint['col']] = hint['value']
+            hints_given += 1
+    print(f"chained hints test suite passed ({hints_given} hints)")
+
+    print("all hint test suites passed")
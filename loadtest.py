@@ -0,0 +1,451 @@
+"""
+Sudoku Web Application - load test
+Drives the API with concurrent keep-alive clients and reports throughput,
+error rate and latency percentiles, optionally while holding a number of idle
+connections open.
+
+Game mode replays realistic sessions: each simulated player starts a puzzle
+at a difficulty drawn from --mix, makes moves (some of them wrong), takes the
+odd hint and finally asks for the solution, then starts over. With --stream
+players start games the way the browser does when the server streams them:
+new-puzzle with "stream": true, then /api/events until the puzzle arrives:
+
+    python loadtest.py --url http://localhost:8000 --mode game --players 50 --duration 60
+    python loadtest.py --url http://localhost:8000 --mode game --players 50 --stream
+
+Endpoint mode hammers a single endpoint. Run it against the sync (gunicorn)
+and the ASGI deployment with the same settings to compare them:
+
+    gunicorn --bind 0.0.0.0:8000 --workers 4 app:app
+    python loadtest.py --url http://localhost:8000 --idle 1000
+
+    gunicorn --bind 0.0.0.0:8000 --workers 4 -k uvicorn.workers.UvicornWorker asgi:app
+    python loadtest.py --url http://localhost:8000 --idle 1000
+
+It can also start the server itself and time how long it takes from launch to
+the first successful API response, failing if that exceeds a budget:
+
+    python loadtest.py --cold-start "gunicorn --bind 127.0.0.1:8000 app:app" --budget 3
+"""
+
+import argparse
+import http.client
+import json
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Client:
+    """A single keep-alive HTTP connection posting JSON to the API"""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+
+    def exchange(self, method: str, path: str, body: Optional[str], headers: dict,
+                 read: Callable[[http.client.HTTPResponse], Any]) -> Tuple[int, Any]:
+        """Send one request and read its response with read(response);
+        returns (status, what read returned)"""
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.conn.request(method, path, body, headers)
+            response = self.conn.getresponse()
+            return response.status, read(response)
+        except (OSError, http.client.HTTPException):
+            # Drop the broken connection and reconnect on the next request
+            self.conn.close()
+            self.conn = None
+            raise
+
+    def post(self, path: str, body: dict):
+        """POST a JSON body; returns (status, parsed response)"""
+        status, payload = self.exchange('POST', path, json.dumps(body),
+                                        {'Content-Type': 'application/json'},
+                                        lambda response: response.read())
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+    def events(self, path: str) -> Tuple[int, List[Tuple[str, Any]]]:
+        """GET a Server-Sent Events stream and read it until the server ends
+        it; returns (status, list of (event name, parsed data))"""
+        def read(response: http.client.HTTPResponse) -> List[Tuple[str, Any]]:
+            received = []
+            event = 'message'
+            for line in iter(response.readline, b''):
+                line = line.decode().rstrip('\r\n')
+                if line.startswith('event:'):
+                    event = line[len('event:'):].strip()
+                elif line.startswith('data:'):
+                    received.append((event, json.loads(line[len('data:'):])))
+                elif not line:
+                    event = 'message'
+            return received
+
+        return self.exchange('GET', path, None, {'Accept': 'text/event-stream'}, read)
+
+
+def hold_idle_connections(host: str, port: int, count: int) -> List[socket.socket]:
+    """Open connections that never send a request (e.g. parked browser tabs)"""
+    sockets = []
+    for _ in range(count):
+        try:
+            sockets.append(socket.create_connection((host, port), timeout=5))
+        except OSError as error:
+            print(f"Could only open {len(sockets)} idle connections: {error}")
+            break
+    return sockets
+
+
+class Recorder:
+    """Collects per-endpoint latencies and errors from all client threads
+
+    Attributes:
+        latencies - dict of endpoint -> list of successful request times
+        errors - Counter of (endpoint, error description)
+        games - number of game sessions played to the end
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.games = 0
+        self.lock = threading.Lock()
+
+    def call(self, client: Client, endpoint: str, body: dict,
+             record: bool = True) -> Optional[dict]:
+        """POST to /api/<endpoint> and record the outcome (unless record is
+        False). Returns the parsed response (also for 4xx replies), or None if
+        the request failed."""
+        start = time.perf_counter()
+        try:
+            status, data = client.post(f'/api/{endpoint}', body)
+            error = None if status in (200, 202) else f"{status} {(data or {}).get('error')}"
+        except (OSError, http.client.HTTPException) as exc:
+            data, error = None, type(exc).__name__
+
+        if record:
+            self.record(endpoint, time.perf_counter() - start, error)
+        return data
+
+    def stream(self, client: Client, session_id: str) -> Optional[dict]:
+        """Read the session's event stream until the puzzle arrives, recorded
+        as "events" (time from opening the stream to the end of it). Returns
+        the puzzle payload, or None if it didn't come."""
+        start = time.perf_counter()
+        try:
+            status, received = client.events(f'/api/events/{session_id}')
+            puzzle = next((data for event, data in received if event == 'puzzle'), None)
+            error = None if puzzle else f'{status} stream ended without a puzzle'
+        except (OSError, http.client.HTTPException, ValueError) as exc:
+            puzzle, error = None, type(exc).__name__
+
+        self.record('events', time.perf_counter() - start, error)
+        return puzzle
+
+    def record(self, endpoint: str, elapsed: float, error: Optional[str]) -> None:
+        with self.lock:
+            if error:
+                self.errors[(endpoint, error)] += 1
+            else:
+                self.latencies[endpoint].append(elapsed)
+
+    def game_finished(self) -> None:
+        with self.lock:
+            self.games += 1
+
+    def report(self, wall: float) -> None:
+        ok = sum(len(samples) for samples in self.latencies.values())
+        failed = sum(self.errors.values())
+        total = ok + failed
+        every = [sample for samples in self.latencies.values() for sample in samples]
+
+        print(f"Requests:    {total} in {wall:.1f}s ({ok / wall:.1f} req/s ok)")
+        print(f"Errors:      {failed} ({100 * failed / max(total, 1):.1f}%)")
+        if self.games:
+            print(f"Games:       {self.games} played to the end ({self.games / wall:.2f}/s)")
+        print(f"Latency:     p50 {1000 * percentile(every, 50):.1f} ms, "
+              f"p95 {1000 * percentile(every, 95):.1f} ms, "
+              f"p99 {1000 * percentile(every, 99):.1f} ms")
+
+        print(f"\n{'endpoint':<15}{'ok':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for endpoint, samples in sorted(self.latencies.items()):
+            print(f"{endpoint:<15}{len(samples):>8}"
+                  f"{1000 * percentile(samples, 50):>10.1f}"
+                  f"{1000 * percentile(samples, 95):>10.1f}"
+                  f"{1000 * percentile(samples, 99):>10.1f}")
+
+        if self.errors:
+            print('\nErrors by kind:')
+            for (endpoint, error), count in self.errors.most_common():
+                print(f"  {count:>7}  {endpoint}: {error}")
+            if any('Invalid session' in error for _, error in self.errors):
+                print("  ('Invalid session' means a request reached a worker that doesn't "
+                      "hold the session - sessions live in each worker's memory)")
+
+
+def run_endpoint_worker(client: Client, recorder: Recorder, endpoint: str,
+                        difficulty: str, deadline: float) -> None:
+    """Create a session, then call one endpoint until the deadline"""
+    session_id: Optional[str] = None
+    while time.time() < deadline:
+        if endpoint == 'new-puzzle':
+            recorder.call(client, endpoint, {'difficulty': difficulty})
+            continue
+
+        if session_id is None:
+            data = recorder.call(client, 'new-puzzle', {'difficulty': difficulty})
+            session_id = (data or {}).get('session_id')
+            if session_id is None:
+                time.sleep(0.1)
+            continue
+
+        recorder.call(client, endpoint, {'session_id': session_id})
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse "easy=5,medium=3,hard=2" into difficulty weights"""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+class Player:
+    """One simulated player working through games until the deadline
+
+    Attributes:
+        client - the player's keep-alive connection
+        recorder - where request outcomes are recorded
+        rng - the player's own random number generator
+        args - parsed command-line options (mix, wrong, hints, moves, think,
+            stream)
+    """
+
+    def __init__(self, client: Client, recorder: Recorder, rng: random.Random, args):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.args = args
+        self.weights = parse_mix(args.mix)
+
+    def think(self) -> None:
+        """Pause like a person would between moves"""
+        if self.args.think > 0:
+            time.sleep(self.rng.expovariate(1 / self.args.think))
+
+    def run(self, deadline: float) -> None:
+        while time.time() < deadline:
+            self.play_game(deadline)
+
+    def start_game(self, difficulty: str) -> Optional[dict]:
+        """Start a game like the browser does; returns the new-puzzle payload"""
+        game = self.recorder.call(self.client, 'new-puzzle',
+                                  {'difficulty': difficulty, 'stream': self.args.stream})
+        if game and 'puzzle' not in game and 'session_id' in game:
+            # 202: the puzzle is generated in the background and streamed
+            # (servers with streaming off answer with the puzzle instead)
+            game = self.recorder.stream(self.client, game['session_id'])
+        return game
+
+    def play_game(self, deadline: float) -> None:
+        difficulty = self.rng.choices(list(self.weights), list(self.weights.values()))[0]
+        game = self.start_game(difficulty)
+        if not game or 'puzzle' not in game:
+            time.sleep(0.1)
+            return
+
+        session_id = game['session_id']
+        board = game['puzzle']
+        seq = game.get('seq', 0)
+
+        # The player's "knowledge": which answers are right. Fetched up front
+        # so the load mix has a controlled share of wrong answers; a real
+        # player doesn't make this call, so it isn't recorded.
+        answer = self.recorder.call(self.client, 'solve', {'session_id': session_id},
+                                    record=False)
+        if not answer or 'solution' not in answer:
+            return
+        solution = answer['solution']
+
+        for _ in range(self.args.moves):
+            empty = [(r, c) for r in range(9) for c in range(9) if board[r][c] == 0]
+            if not empty or time.time() >= deadline:
+                break
+            self.think()
+
+            if self.rng.random() < self.args.hints:
+                hint = self.recorder.call(self.client, 'hint', {'session_id': session_id})
+                if not hint or 'value' not in hint:
+                    return
+                moved = self.recorder.call(self.client, 'move', {
+                    'session_id': session_id, 'seq': seq,
+                    'row': hint['row'], 'col': hint['col'], 'value': hint['value']})
+                if not moved or 'seq' not in moved:
+                    return
+                board[hint['row']][hint['col']] = hint['value']
+                seq = moved['seq']
+                continue
+
+            row, col = self.rng.choice(empty)
+            value = solution[row][col]
+            if self.rng.random() < self.args.wrong:
+                value = self.rng.choice([v for v in range(1, 10) if v != value])
+
+            result = self.recorder.call(self.client, 'validate-move', {
+                'session_id': session_id, 'seq': seq,
+                'row': row, 'col': col, 'value': value})
+            if not result:
+                return
+            if 'board' in result:
+                # Out of sync: adopt the server's board like the browser does
+                board, seq = result['board'], result['seq']
+            elif 'error' in result:
+                return
+            elif result.get('valid'):
+                board[row][col] = value
+                seq = result['seq']
+
+        self.recorder.call(self.client, 'solve', {'session_id': session_id})
+        self.recorder.game_finished()
+
+
+def measure_cold_start(command: str, url: str, budget: float, timeout: float) -> bool:
+    """Launch the server and time it until /api/new-puzzle first succeeds.
+    Returns True if that took no longer than budget seconds."""
+    target = urlparse(url)
+    client = Client(target.hostname, target.port or 80, timeout)
+
+    started = time.perf_counter()
+    server = subprocess.Popen(shlex.split(command))
+    try:
+        while True:
+            if server.poll() is not None:
+                print(f"Server exited with code {server.returncode} before responding")
+                return False
+            if time.perf_counter() - started > timeout:
+                print(f"No response within {timeout:.0f}s")
+                return False
+            try:
+                status, _ = client.post('/api/new-puzzle', {'difficulty': 'easy'})
+                if status == 200:
+                    break
+            except (OSError, http.client.HTTPException):
+                time.sleep(0.02)
+        elapsed = time.perf_counter() - started
+
+        # A second request shows what a warm worker costs, for comparison
+        second = time.perf_counter()
+        client.post('/api/new-puzzle', {'difficulty': 'easy'})
+        warm = time.perf_counter() - second
+    finally:
+        server.terminate()
+        server.wait()
+
+    verdict = 'OK' if elapsed <= budget else 'OVER BUDGET'
+    print(f"Command:        {command}")
+    print(f"First response: {1000 * elapsed:.0f} ms after launch (budget {1000 * budget:.0f} ms) {verdict}")
+    print(f"Next request:   {1000 * warm:.0f} ms")
+    return elapsed <= budget
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Load test the Sudoku API')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--mode', default='endpoint', choices=['endpoint', 'game'])
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds')
+    parser.add_argument('--concurrency', '--players', type=int, default=50,
+                        help='concurrent clients (simulated players in game mode)')
+    # endpoint mode
+    parser.add_argument('--endpoint', default='hint',
+                        choices=['hint', 'solve', 'new-puzzle'])
+    parser.add_argument('--difficulty', default='easy')
+    # game mode
+    parser.add_argument('--mix', default='easy=5,medium=3,hard=2',
+                        help='difficulty weights for new games')
+    parser.add_argument('--moves', type=int, default=40, help='moves per game at most')
+    parser.add_argument('--wrong', type=float, default=0.15,
+                        help='share of moves that are wrong answers')
+    parser.add_argument('--hints', type=float, default=0.05,
+                        help='share of moves that are hints instead')
+    parser.add_argument('--think', type=float, default=0.0,
+                        help='mean seconds a player pauses between moves')
+    parser.add_argument('--stream', action='store_true',
+                        help='start games over /api/events, as the browser does '
+                             'when the server streams')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--idle', type=int, default=0,
+                        help='idle connections to hold open during the run')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--cold-start', metavar='COMMAND',
+                        help='launch this server command and time its first response')
+    parser.add_argument('--budget', type=float, default=3.0,
+                        help='cold-start budget in seconds')
+    args = parser.parse_args()
+
+    if args.cold_start:
+        ok = measure_cold_start(args.cold_start, args.url, args.budget, args.timeout)
+        sys.exit(0 if ok else 1)
+
+    target = urlparse(args.url)
+    host, port = target.hostname, target.port or 80
+
+    idle = hold_idle_connections(host, port, args.idle)
+
+    recorder = Recorder()
+    deadline = time.time() + args.duration
+    seeds = random.Random(args.seed)
+    if args.mode == 'game':
+        threads = [
+            threading.Thread(target=Player(Client(host, port, args.timeout), recorder,
+                                           random.Random(seeds.random()), args).run,
+                             args=(deadline,))
+            for _ in range(args.concurrency)
+        ]
+    else:
+        threads = [
+            threading.Thread(target=run_endpoint_worker, args=(
+                Client(host, port, args.timeout), recorder, args.endpoint,
+                args.difficulty, deadline))
+            for _ in range(args.concurrency)
+        ]
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.time() - started
+
+    for sock in idle:
+        sock.close()
+
+    target_name = f'{args.mix} games' if args.mode == 'game' else f'/api/{args.endpoint}'
+    print(f"Target:      {args.url} ({target_name})")
+    print(f"Clients:     {args.concurrency} active, {len(idle)} idle")
+    recorder.report(wall)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Sudoku Web Application - metrics
+Prometheus metrics for requests, the solver and the puzzle generator, exposed
+at /metrics. When PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py does this)
+every worker writes its samples there and a scrape of any worker returns the
+totals across all of them. Work done in a process pool (asgi.py) is run through
+collect(), which hands its solver and generator observations back to the
+parent to record with replay().
+"""
+
+import functools
+import os
+from typing import Any, Callable, List, Optional, Tuple
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Gauge, Histogram, generate_latest, multiprocess)
+
+# Latency buckets (seconds) fitting both cheap lookups and hard generation
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+NODE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000, 100000)
+
+REQUESTS = Counter(
+    'sudoku_http_requests_total', 'HTTP requests handled',
+    ['route', 'method', 'status'])
+REQUEST_LATENCY = Histogram(
+    'sudoku_http_request_duration_seconds', 'HTTP request latency',
+    ['route', 'method'], buckets=LATENCY_BUCKETS)
+
+SOLVER_NODES = Histogram(
+    'sudoku_solver_nodes_expanded', 'Search states expanded per solver run',
+    ['difficulty', 'purpose'], buckets=NODE_BUCKETS)
+SOLVER_LATENCY = Histogram(
+    'sudoku_solver_duration_seconds', 'Solver run time',
+    ['difficulty', 'purpose'], buckets=LATENCY_BUCKETS)
+SOLVER_TIMEOUTS = Counter(
+    'sudoku_solver_timeouts_total', 'Solver runs that hit the node budget',
+    ['difficulty', 'purpose'])
+
+GENERATOR_REMOVALS = Counter(
+    'sudoku_generator_removal_attempts_total',
+    'Cells the generator tried to remove, by whether the removal was kept',
+    ['difficulty', 'outcome'])
+GENERATOR_RETRIES = Counter(
+    'sudoku_generator_solved_board_retries_total',
+    'Times a solved-board generation attempt failed and was restarted')
+
+SESSIONS = Gauge(
+    'sudoku_sessions', 'Game sessions held in memory',
+    multiprocess_mode='livesum')
+
+
+# Observations held back while collect() runs, as (function name, args)
+_collected: Optional[List[Tuple[str, tuple]]] = None
+
+
+def replayable(observe: Callable) -> Callable:
+    """Make an observe_* function hold its observation back during collect()"""
+    @functools.wraps(observe)
+    def wrapper(*args) -> None:
+        if _collected is not None:
+            _collected.append((observe.__name__, args))
+        else:
+            observe(*args)
+    return wrapper
+
+
+def collect(func: Callable, *args) -> Tuple[Any, List[Tuple[str, tuple]]]:
+    """
+    Call func(*args) without recording its solver/generator metrics, for use
+    in a process-pool child whose samples would otherwise be lost
+    Returns: (func's result, observations to pass to replay in the parent)
+    """
+    global _collected
+    _collected = []
+    try:
+        return func(*args), _collected
+    finally:
+        _collected = None
+
+
+def replay(observations: List[Tuple[str, tuple]]) -> None:
+    """Record observations returned by collect"""
+    for name, args in observations:
+        globals()[name](*args)
+
+
+def observe_request(route: str, method: str, status: int, seconds: float) -> None:
+    """Record one handled request (route is the URL rule, not the raw path)"""
+    REQUEST_LATENCY.labels(route, method).observe(seconds)
+    REQUESTS.labels(route, method, str(status)).inc()
+
+
+@replayable
+def observe_solver(difficulty: str, purpose: str, stats: dict, seconds: float) -> None:
+    """Record one solver run (stats as filled in by Assignment8.DFS)"""
+    SOLVER_NODES.labels(difficulty, purpose).observe(stats.get('nodes', 0))
+    SOLVER_LATENCY.labels(difficulty, purpose).observe(seconds)
+    if stats.get('timed_out'):
+        SOLVER_TIMEOUTS.labels(difficulty, purpose).inc()
+
+
+@replayable
+def observe_removal(difficulty: str, outcome: str) -> None:
+    """Record one cell removal attempt ("kept" or "restored")"""
+    GENERATOR_REMOVALS.labels(difficulty, outcome).inc()
+
+
+@replayable
+def observe_retries(count: int) -> None:
+    """Record restarted solved-board generation attempts"""
+    GENERATOR_RETRIES.inc(count)
+
+
+def render() -> Tuple[bytes, str]:
+    """Return the exposition text and its content type"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
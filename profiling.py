@@ -0,0 +1,188 @@
+"""
+Sudoku Web Application - solver profiling
+Runs a call under cProfile (exact self-time per function) and a stack sampler
+(collapsed stacks that flamegraph.pl, speedscope or inferno can render).
+
+Used by the API's ?profile=1 debug flag (see app.py) and from the command line:
+
+    python profiling.py create-puzzle --difficulty hard
+    python profiling.py solve --out profiles
+    flamegraph.pl profiles/solve-*.folded > solve.svg
+
+The command line profiles the pure-Python solver unless --compiled is given:
+a compiled solver shows up as a single built-in call with nothing inside it.
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.001
+
+# Shown with profiles of the compiled solver, whose functions cProfile can't see
+COMPILED_SOLVER_WARNING = ('The compiled solver is loaded; its functions show up as one '
+                           'built-in call. Set SUDOKU_PURE_SOLVER=1 to profile inside it.')
+
+
+def frame_name(frame) -> str:
+    """Name a stack frame as file:function, safe for the collapsed format"""
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}".replace(';', ':')
+
+
+class StackSampler:
+    """Samples the call stack of one thread from a background thread
+
+    Attributes:
+        interval - seconds between samples
+        thread_id - ident of the thread being sampled
+        counts - Counter of collapsed stacks ("outer;...;inner") -> samples
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.thread_id = None
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start sampling the calling thread"""
+        self.thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """The samples in collapsed-stack format, one "stack count" per line"""
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.counts.items()))
+
+
+class ProfileReport:
+    """The outcome of one profiled call
+
+    Attributes:
+        profiler - the cProfile.Profile that ran during the call
+        sampler - the StackSampler that ran during the call
+        seconds - wall-clock duration of the call
+    """
+
+    def __init__(self, profiler: cProfile.Profile, sampler: StackSampler, seconds: float):
+        self.profiler = profiler
+        self.sampler = sampler
+        self.seconds = seconds
+
+    def top_functions(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Functions with the most self-time, highest first"""
+        stats = pstats.Stats(self.profiler).stats
+        rows = []
+        for (filename, line, name), (_, calls, self_time, cumulative, _) in stats.items():
+            rows.append({
+                'function': f'{os.path.basename(filename)}:{line}({name})',
+                'calls': calls,
+                'self_seconds': round(self_time, 6),
+                'cumulative_seconds': round(cumulative, 6)
+            })
+        rows.sort(key=lambda row: row['self_seconds'], reverse=True)
+        return rows[:limit]
+
+    def format_top(self, limit: int = 10) -> str:
+        """top_functions as a small text table"""
+        lines = [f'{"self s":>9} {"cum s":>9} {"calls":>9}  function']
+        for row in self.top_functions(limit):
+            lines.append(f'{row["self_seconds"]:9.4f} {row["cumulative_seconds"]:9.4f} '
+                         f'{row["calls"]:9d}  {row["function"]}')
+        return '\n'.join(lines)
+
+    def write(self, directory: str, name: str) -> Dict[str, str]:
+        """Save <name>-<timestamp>.folded (collapsed stacks) and .pstats
+        (for snakeviz / pstats) into directory; returns their paths"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}')
+
+        with open(base + '.folded', 'w') as folded:
+            folded.write(self.sampler.collapsed())
+        self.profiler.dump_stats(base + '.pstats')
+
+        return {'folded': base + '.folded', 'pstats': base + '.pstats'}
+
+
+def profile_call(func: Callable, *args, **kwargs) -> Tuple[Any, ProfileReport]:
+    """Call func(*args, **kwargs) under the profiler and the stack sampler
+    Returns: (func's result, ProfileReport)"""
+    profiler = cProfile.Profile()
+    sampler = StackSampler()
+
+    start = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        sampler.stop()
+
+    return result, ProfileReport(profiler, sampler, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Profile the sudoku solver')
+    parser.add_argument('target', choices=['create-puzzle', 'solve'],
+                        help='create-puzzle runs PuzzleGenerator.create_puzzle; '
+                             'solve runs DFS on the bundled test puzzles')
+    parser.add_argument('--difficulty', default='hard')
+    parser.add_argument('--out', default='profiles', help='directory for output files')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--compiled', action='store_true',
+                        help='profile the compiled solver, if built, instead of the '
+                             'pure-Python one')
+    args = parser.parse_args()
+
+    # Must be decided before solver_core is first imported
+    if not args.compiled:
+        os.environ['SUDOKU_PURE_SOLVER'] = '1'
+
+    import app
+    from solver_core import SOLVER_IMPLEMENTATION, Board, DFS, first_puzzle, second_puzzle
+
+    if args.target == 'create-puzzle':
+        _, report = profile_call(app.PuzzleGenerator.create_puzzle, args.difficulty)
+    else:
+        def solve_all() -> None:
+            for moves in (first_puzzle, second_puzzle):
+                board = Board()
+                for move in moves:
+                    board.update(*move)
+                DFS(board)
+        _, report = profile_call(solve_all)
+
+    paths = report.write(args.out, args.target)
+    print(f'{args.target} took {1000 * report.seconds:.0f} ms ({SOLVER_IMPLEMENTATION} solver)\n')
+    if SOLVER_IMPLEMENTATION == 'compiled':
+        print(COMPILED_SOLVER_WARNING + '\n')
+    print(report.format_top(args.top))
+    print(f'\nCollapsed stacks: {paths["folded"]}\ncProfile stats:   {paths["pstats"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+#!/bin/bash
+# Production deployment script for Sudoku Web App (ASGI mode)
+
+echo "🎮 Starting Sudoku Web Application..."
+
+# Check if virtual environment exists
+if [ ! -d "venv" ]; then
+    echo "Creating virtual environment..."
+    python3 -m venv venv
+fi
+
+# Activate virtual environment
+echo "Activating virtual environment..."
+source venv/bin/activate
+
+# Install/update dependencies
+echo "Installing dependencies..."
+pip install -r requirements-asgi.txt
+
+# Stop any existing instances
+echo "Stopping existing instances..."
+pkill -f "gunicorn" 2>/dev/null || true
+
+# Each worker starts a pool of CPU count / workers solver processes (see asgi.py)
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-4}
+
+# Start the application with gunicorn
+echo "Starting ASGI server with gunicorn + uvicorn workers..."
+echo "🌐 Application will be available at: http://0.0.0.0:8000"
+echo ""
+echo "Press Ctrl+C to stop the server"
+echo ""
+
+gunicorn --bind 0.0.0.0:8000 --workers "$WEB_CONCURRENCY" --timeout 120 -k uvicorn.workers.UvicornWorker asgi:app
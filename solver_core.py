@@ -0,0 +1,120 @@
+"""
+Sudoku Web Application - solver core loader
+Imports the solver from 'Assignment 8'. When build_solver.py has compiled it
+with mypyc, the compiled extension modules sit next to the .py files and Python
+picks them automatically. The pure-Python sources are used instead when the
+compiled modules can't be loaded (built for another Python, shared library
+missing), are stale (the sources changed since the build), or
+SUDOKU_PURE_SOLVER=1 is set. Both behave identically (build_solver.py --check).
+"""
+
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import sys
+from types import ModuleType
+from typing import Dict, Optional
+
+# The solver's directory name has a space, so it can't be imported as a
+# package; add it to the path once
+SOLVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Assignment 8')
+if SOLVER_DIR not in sys.path:
+    sys.path.append(SOLVER_DIR)
+
+# The modules build_solver.py compiles, and where it records what it compiled
+SOLVER_SOURCES = ['Assignment8.py', 'stack_and_queue.py']
+BUILD_RECORD = os.path.join(SOLVER_DIR, 'solver_build.json')
+
+logger = logging.getLogger(__name__)
+
+
+def source_hashes() -> Dict[str, str]:
+    """SHA-256 of each of SOLVER_SOURCES"""
+    hashes = {}
+    for filename in SOLVER_SOURCES:
+        with open(os.path.join(SOLVER_DIR, filename), 'rb') as source:
+            hashes[filename] = hashlib.sha256(source.read()).hexdigest()
+    return hashes
+
+
+def stale_build_reason() -> Optional[str]:
+    """Why compiled modules next to the sources can't be trusted to match
+    them, or None if they match (or there are none)"""
+    compiled = [filename for filename in SOLVER_SOURCES
+                if not importlib.util.find_spec(filename[:-3]).origin.endswith('.py')]
+    if not compiled:
+        return None
+
+    try:
+        with open(BUILD_RECORD) as record:
+            built = json.load(record)
+    except (OSError, ValueError):
+        return f'{BUILD_RECORD} is missing or unreadable'
+
+    changed = [filename for filename, digest in source_hashes().items()
+               if built.get(filename) != digest]
+    if changed:
+        return f'{", ".join(changed)} changed since the compiled build'
+    return None
+
+
+def load_source(name: str, filename: str) -> ModuleType:
+    """Execute SOLVER_DIR/filename as module `name`, ignoring compiled builds"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SOLVER_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_pure_solver(name: str = 'Assignment8') -> ModuleType:
+    """Load the pure-Python solver from its .py sources
+
+    Args:
+        name - module name to register it under; any other name than
+            Assignment8 loads a private copy that leaves the imported solver
+            (and its stack_and_queue) untouched
+
+    Returns:
+        the solver module
+    """
+    stack_and_queue = sys.modules.get('stack_and_queue')
+    load_source('stack_and_queue', 'stack_and_queue.py')
+    try:
+        return load_source(name, 'Assignment8.py')
+    finally:
+        if name != 'Assignment8' and stack_and_queue is not None:
+            sys.modules['stack_and_queue'] = stack_and_queue
+
+
+def is_compiled(module: ModuleType) -> bool:
+    """True if module was loaded from a compiled extension rather than source"""
+    return not module.__file__.endswith('.py')
+
+
+# Why the pure-Python solver is running although a compiled one is present
+SOLVER_FALLBACK_REASON: Optional[str] = None
+
+if os.environ.get('SUDOKU_PURE_SOLVER') == '1':
+    solver = load_pure_solver()
+else:
+    SOLVER_FALLBACK_REASON = stale_build_reason()
+    if SOLVER_FALLBACK_REASON is None:
+        try:
+            import Assignment8 as solver
+        except ImportError as error:
+            SOLVER_FALLBACK_REASON = f'compiled solver failed to load: {error}'
+    if SOLVER_FALLBACK_REASON is not None:
+        logger.warning('Using the pure-Python solver: %s (rebuild with python build_solver.py)',
+                       SOLVER_FALLBACK_REASON)
+        solver = load_pure_solver()
+
+# 'compiled' or 'python', for logs and the startup banner
+SOLVER_IMPLEMENTATION = 'compiled' if is_compiled(solver) else 'python'
+
+Board = solver.Board
+DFS = solver.DFS
+first_puzzle = solver.first_puzzle
+second_puzzle = solver.second_puzzle
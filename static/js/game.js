@@ -5,6 +5,9 @@
 class SudokuGame {
     constructor() {
         this.sessionId = null;
+        this.eventSource = null;
+        this.seq = 0;
+        this.pendingSync = Promise.resolve();
         this.board = this.createEmptyBoard();
         this.initialBoard = this.createEmptyBoard();
         this.solution = null;
@@ -42,33 +45,27 @@ class SudokuGame {
 
     async startNewGame(difficulty) {
         try {
+            // When the server supports streaming, the puzzle is generated in
+            // the background and arrives on the session's event stream
+            const stream = document.body.dataset.streamEvents === 'true' &&
+                typeof EventSource !== 'undefined';
+
             const response = await fetch('/api/new-puzzle', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ difficulty })
+                body: JSON.stringify({ difficulty, stream })
             });
 
             const data = await response.json();
 
-            this.sessionId = data.session_id;
-            this.board = data.puzzle;
-            this.initialBoard = data.puzzle.map(row => [...row]);
-            this.difficulty = difficulty;
-            this.lives = 3;
-            this.startTime = Date.now();
-            this.elapsedTime = 0;
-            this.score = 0;
-            this.hintsUsed = 0;
-            this.pencilMarks = this.createEmptyPencilMarks();
-            this.history = [];
-            this.historyIndex = -1;
-            this.gameActive = true;
-
-            this.saveState();
-            this.renderBoard();
-            this.updateStats();
-            this.startTimer();
-            this.showGameBoard();
+            if (response.status === 202) {
+                this.gameActive = false;
+                this.sessionId = data.session_id;
+                this.openEventStream(data.session_id);
+                this.showGenerationProgress(0, null);
+            } else {
+                this.beginGame(data);
+            }
 
         } catch (error) {
             console.error('Error starting new game:', error);
@@ -76,7 +73,90 @@ class SudokuGame {
         }
     }
 
-    async validateMove(row, col, value) {
+    beginGame(data) {
+        this.sessionId = data.session_id;
+        this.seq = data.seq || 0;
+        this.pendingSync = Promise.resolve();
+        this.board = data.puzzle;
+        this.initialBoard = data.puzzle.map(row => [...row]);
+        this.difficulty = data.difficulty;
+        this.lives = 3;
+        this.startTime = Date.now();
+        this.elapsedTime = 0;
+        this.score = 0;
+        this.hintsUsed = 0;
+        this.pencilMarks = this.createEmptyPencilMarks();
+        this.history = [];
+        this.historyIndex = -1;
+        this.gameActive = true;
+
+        this.showGenerationProgress(null, null);
+        this.showHintMessage({});
+        this.saveState();
+        this.renderBoard();
+        this.updateStats();
+        this.startTimer();
+        this.showGameBoard();
+    }
+
+    openEventStream(sessionId) {
+        this.closeEventStream();
+        this.eventSource = new EventSource(`/api/events/${sessionId}`);
+
+        this.eventSource.addEventListener('progress', (event) => {
+            const progress = JSON.parse(event.data);
+            this.showGenerationProgress(progress.removed, progress.target);
+        });
+
+        // The stream ends after either of these, so stop listening
+        this.eventSource.addEventListener('puzzle', (event) => {
+            const data = JSON.parse(event.data);
+            this.closeEventStream();
+            // Ignore a late puzzle once the player has moved on
+            if (this.sessionId === data.session_id && !this.gameActive) {
+                this.beginGame(data);
+            }
+        });
+
+        const source = this.eventSource;
+        const fail = () => {
+            this.closeEventStream();
+            this.showGenerationProgress(null, null);
+            alert('Failed to start new game. Please try again.');
+        };
+
+        this.eventSource.addEventListener('failed', fail);
+
+        // An error response (e.g. 400 when the session lives on another
+        // worker or the server restarted) closes the stream for good without
+        // a "failed" event; other errors leave it reconnecting
+        this.eventSource.addEventListener('error', () => {
+            if (source.readyState === EventSource.CLOSED && this.eventSource === source) {
+                fail();
+            }
+        });
+    }
+
+    closeEventStream() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+
+    queueRequest(task) {
+        // Board-changing requests go out one at a time, each carrying the
+        // seq returned by the one before it
+        const result = this.pendingSync.then(task);
+        this.pendingSync = result.catch(() => {});
+        return result;
+    }
+
+    validateMove(row, col, value) {
+        return this.queueRequest(() => this.postValidateMove(row, col, value));
+    }
+
+    async postValidateMove(row, col, value) {
         try {
             const response = await fetch('/api/validate-move', {
                 method: 'POST',
@@ -86,17 +166,111 @@ class SudokuGame {
                     row: row,
                     col: col,
                     value: value,
-                    current_board: this.board
+                    seq: this.seq
                 })
             });
 
-            return await response.json();
+            const data = await response.json();
+
+            if (response.status === 409) {
+                this.resync(data);
+                return null;
+            }
+
+            if (data.seq !== undefined) {
+                this.seq = data.seq;
+            }
+
+            return data;
         } catch (error) {
             console.error('Error validating move:', error);
             return { valid: false, reason: 'error' };
         }
     }
 
+    sendMove(row, col, value) {
+        return this.queueRequest(async () => {
+            try {
+                const response = await fetch('/api/move', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        session_id: this.sessionId,
+                        row: row,
+                        col: col,
+                        value: value,
+                        seq: this.seq
+                    })
+                });
+
+                const data = await response.json();
+
+                if (response.status === 409) {
+                    this.resync(data);
+                } else if (data.seq !== undefined) {
+                    this.seq = data.seq;
+                }
+            } catch (error) {
+                console.error('Error sending move:', error);
+            }
+        });
+    }
+
+    sendUndo() {
+        return this.queueRequest(async () => {
+            try {
+                const response = await fetch('/api/undo', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        session_id: this.sessionId,
+                        seq: this.seq
+                    })
+                });
+
+                const data = await response.json();
+
+                if (response.status === 409) {
+                    this.resync(data);
+                } else if (data.seq !== undefined) {
+                    // The server reverted its latest move; keep that cell in step
+                    this.seq = data.seq;
+                    if (this.board[data.row][data.col] !== data.value) {
+                        this.board[data.row][data.col] = data.value;
+                        this.renderBoard();
+                    }
+                }
+            } catch (error) {
+                console.error('Error undoing move:', error);
+            }
+        });
+    }
+
+    syncBoard(previousBoard) {
+        // Send only the cells that changed (e.g. after redo)
+        for (let row = 0; row < 9; row++) {
+            for (let col = 0; col < 9; col++) {
+                if (this.board[row][col] !== previousBoard[row][col]) {
+                    this.sendMove(row, col, this.board[row][col]);
+                }
+            }
+        }
+    }
+
+    resync(data) {
+        // The server's board is authoritative when the two drift apart
+        if (!data.board) return;
+
+        this.board = data.board.map(row => [...row]);
+        this.seq = data.seq;
+
+        // Local undo steps no longer match the server's move history
+        this.history = [];
+        this.historyIndex = -1;
+        this.saveState();
+        this.renderBoard();
+    }
+
     async getSolution() {
         try {
             const response = await fetch('/api/solve', {
@@ -115,13 +289,12 @@ class SudokuGame {
 
     async getHint() {
         try {
+            await this.pendingSync;
+
             const response = await fetch('/api/hint', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    session_id: this.sessionId,
-                    current_board: this.board
-                })
+                body: JSON.stringify({ session_id: this.sessionId })
             });
 
             const data = await response.json();
@@ -162,12 +335,21 @@ class SudokuGame {
         // Validate the move
         const validation = await this.validateMove(row, col, value);
 
+        if (!validation) {
+            // Board was out of sync and has been reloaded from the server
+            return;
+        }
+
         if (!validation.valid) {
             // REVERT THE MOVE - board should never be in unsolvable state
             this.board[row][col] = oldValue;
             this.pencilMarks[row][col] = oldPencilMarks;
 
-            // Flash conflict animation on the cell
+            // Re-render with reverted state
+            this.renderBoard();
+            this.updateStats();
+
+            // Flash conflict animation on the cell and the ones it clashes with
             const cellElement = document.querySelector(
                 `.cell[data-row="${row}"][data-col="${col}"]`
             );
@@ -175,14 +357,11 @@ class SudokuGame {
                 cellElement.classList.add('conflict');
                 setTimeout(() => cellElement.classList.remove('conflict'), 400);
             }
+            this.showConflicts(validation);
 
             // Show alert and lose a life
             this.loseLife(validation.message);
 
-            // Re-render with reverted state
-            this.renderBoard();
-            this.updateStats();
-
         } else {
             // Valid move - commit it by saving state
             this.saveState();
@@ -225,9 +404,15 @@ class SudokuGame {
         if (!this.gameActive) return;
         if (this.initialBoard[row][col] !== 0) return;
 
-        this.saveState();
-        this.board[row][col] = 0;
         this.pencilMarks[row][col].clear();
+
+        // Each undo step is one server move, so only a placed number is
+        // erased through the history
+        if (this.board[row][col] !== 0) {
+            this.board[row][col] = 0;
+            this.saveState();
+            this.sendMove(row, col, 0);
+        }
         this.renderBoard();
     }
 
@@ -237,10 +422,12 @@ class SudokuGame {
         const hint = await this.getHint();
         if (!hint) return;
 
-        this.saveState();
         this.hintsUsed++;
         this.board[hint.row][hint.col] = hint.value;
         this.pencilMarks[hint.row][hint.col].clear();
+        this.saveState();
+        this.sendMove(hint.row, hint.col, hint.value);
+        this.showHintMessage(hint);
 
         // Highlight the hint cell
         const cellElement = document.querySelector(
@@ -356,6 +543,7 @@ class SudokuGame {
             this.historyIndex--;
             const state = this.history[this.historyIndex];
             this.board = state.board.map(row => [...row]);
+            this.sendUndo();
             this.pencilMarks = state.pencilMarks.map(row =>
                 row.map(cell => new Set(cell))
             );
@@ -370,7 +558,9 @@ class SudokuGame {
         if (this.historyIndex < this.history.length - 1) {
             this.historyIndex++;
             const state = this.history[this.historyIndex];
+            const previousBoard = this.board;
             this.board = state.board.map(row => [...row]);
+            this.syncBoard(previousBoard);
             this.pencilMarks = state.pencilMarks.map(row =>
                 row.map(cell => new Set(cell))
             );
@@ -503,6 +693,56 @@ class SudokuGame {
         document.getElementById('score').textContent = this.score;
     }
 
+    showGenerationProgress(removed, target) {
+        const status = document.getElementById('generation-status');
+
+        if (removed === null) {
+            status.textContent = '';
+        } else if (!target) {
+            status.textContent = 'Generating puzzle…';
+        } else {
+            status.textContent = `Generating… ${removed} of ${target} cells removed`;
+        }
+    }
+
+    showHintMessage(hint) {
+        const message = document.getElementById('hint-message');
+        const cell = `row ${hint.row + 1}, column ${hint.col + 1}`;
+
+        switch (hint.technique) {
+            case 'naked single':
+                message.textContent = `Naked single: ${hint.value} is the only number that fits ${cell}.`;
+                break;
+            case 'hidden single':
+                message.textContent = `Hidden single: ${cell} is the only place for ${hint.value} in its ${hint.unit}.`;
+                break;
+            case 'pointing pair':
+                message.textContent = `Pointing pair: after ruling out candidates that a box forces onto one line, ${hint.value} is the only option at ${cell}.`;
+                break;
+            case null:
+            case undefined:
+                message.textContent = '';
+                break;
+            default:
+                message.textContent = `Revealed ${hint.value} at ${cell}.`;
+        }
+    }
+
+    showConflicts(result) {
+        if (!result.conflicts) return;
+
+        // Flash the cells that clash with the rejected number
+        result.conflicts.forEach(([row, col]) => {
+            const cellElement = document.querySelector(
+                `.cell[data-row="${row}"][data-col="${col}"]`
+            );
+            if (cellElement) {
+                cellElement.classList.add('conflict');
+                setTimeout(() => cellElement.classList.remove('conflict'), 400);
+            }
+        });
+    }
+
     showGameBoard() {
         document.getElementById('difficulty-container').style.display = 'none';
         document.getElementById('board-container').style.display = 'block';
@@ -515,6 +755,8 @@ class SudokuGame {
         document.getElementById('board-container').style.display = 'none';
         document.getElementById('controls-container').style.display = 'none';
         document.getElementById('number-pad').style.display = 'none';
+        this.showGenerationProgress(null, null);
+        this.closeEventStream();
         this.stopTimer();
     }
 